@@ -5,6 +5,8 @@ ifc_assembly.py (AUTO WRAP + Payload runtime check, NO TypeGuard)
 Rule:
 - If payload already has props["assembly_path"] (non-empty) -> PREPEND (wrap outer)
 - Else -> APPEND (create first level)
+- Payload dicts are annotated IN PLACE (no per-leaf defensive copy);
+  see ASSEMBLY_IN_PLACE
 
 Typing:
 - MatData is Any (GH reality)
@@ -13,7 +15,9 @@ Typing:
 
 from __future__ import annotations
 
-from typing import Any, Dict, List, Tuple, Optional, cast
+from functools import lru_cache
+from operator import itemgetter
+from typing import Any, Dict, List, Tuple, Optional, Union, cast
 from ifc_types import Payload  # TypedDict contract
 
 try:
@@ -25,17 +29,27 @@ except Exception:
 # ------------------------------------------------------------------------------
 # GH helpers
 # ------------------------------------------------------------------------------
+# _unwrap/_wrap are bound once at import time, so the hot path never re-checks
+# whether GH_ObjectWrapper is available.
 
-def _unwrap(x: Any) -> Any:
-    if GH_ObjectWrapper is not None and isinstance(x, GH_ObjectWrapper):  # type: ignore
-        return getattr(x, "Value", x)
-    return x
+_GHOW = GH_ObjectWrapper
 
+if _GHOW is not None:
+    def _unwrap(x: Any) -> Any:
+        if isinstance(x, _GHOW):  # type: ignore
+            return getattr(x, "Value", x)
+        return x
 
-def _wrap(x: Any) -> Any:
-    if GH_ObjectWrapper is not None and isinstance(x, dict):  # type: ignore
-        return GH_ObjectWrapper(x)
-    return x
+    def _wrap(x: Any) -> Any:
+        if isinstance(x, dict):
+            return _GHOW(x)  # type: ignore
+        return x
+else:
+    def _unwrap(x: Any) -> Any:
+        return x
+
+    def _wrap(x: Any) -> Any:
+        return x
 
 
 def _is_datatree_like(x: Any) -> bool:
@@ -46,21 +60,34 @@ def _is_datatree_like(x: Any) -> bool:
 # Payload runtime validation (no TypeGuard)
 # ------------------------------------------------------------------------------
 
+def _is_payload_fast(x: Any) -> bool:
+    """
+    Cheap structural probe: plain dict carrying the three required core keys.
+    Used by _walk to gate the full validator below.
+    """
+    return type(x) is dict and "unit_id" in x and "geo" in x and "name" in x
+
+
+# one C-level multi-key lookup for the required core keys (raises KeyError if any is missing)
+_REQ_KEYS = itemgetter("unit_id", "name", "geo")
+
+
 def is_payload(x: Any) -> bool:
     """
     Runtime shape check for ifc_types.Payload.
 
     We can't do isinstance(x, Payload) because Payload is TypedDict (typing-only).
     """
-    if not isinstance(x, dict):
+    if type(x) is not dict:
         return False
 
-    # Must have these stable core keys (per ifc_types.Payload) :contentReference[oaicite:3]{index=3}
-    if not isinstance(x.get("unit_id", None), str):
+    # Must have these stable core keys (per ifc_types.Payload).
+    # Payload strings are always plain str here, so exact type checks suffice.
+    try:
+        uid, nm, _geo = _REQ_KEYS(x)
+    except KeyError:
         return False
-    if not isinstance(x.get("name", None), str):
-        return False
-    if "geo" not in x:
+    if type(uid) is not str or type(nm) is not str:
         return False
 
     # props can be missing (we'll normalize), but if present must be dict
@@ -93,112 +120,349 @@ def _normalize_payload_inplace(p: Dict[str, Any]) -> None:
 # Assembly helpers
 # ------------------------------------------------------------------------------
 
-def _ensure_props(payload: Dict[str, Any]) -> Dict[str, Any]:
-    props = payload.get("props")
-    if not isinstance(props, dict):
-        props = {}
-        payload["props"] = props
-    return props
-
-
 def _build_key(sub_name: str, key_suffix: Optional[str]) -> str:
-    base = sub_name.strip()
-    if not base:
+    """Inputs are already canonical (stripped, empty suffix -> None) by annotate_subassembly."""
+    if not sub_name:
         return ""
     if key_suffix:
-        suf = str(key_suffix).strip()
-        if suf:
-            return f"{base}|{suf}"
-    return base
+        return f"{sub_name}|{key_suffix}"
+    return sub_name
+
+
+@lru_cache(maxsize=4096)
+def _build_key_cached(base: str, suf: Optional[str]) -> str:
+    """_build_key memoized: the same (Name, KeySuffix) is applied to every leaf."""
+    return _build_key(base, suf)
+
+
+# ------------------------------------------------------------------------------
+# Assembly path nodes
+# ------------------------------------------------------------------------------
+# USE_SLOTS_NODES=False -> {"name": ..., "key": ...} dicts, the ifc_types contract (default)
+# USE_SLOTS_NODES=True  -> _AssemblyNode levels (compact, slot access). Opt-in only:
+#   ifc_exporter reads them, but ifc_exporter_fixed / ifc_assembly_fixed skip non-dict
+#   levels and json.dumps cannot serialize them. _AssemblyNode offers .get() and .to_dict().
+USE_SLOTS_NODES = False
+
 
+class _AssemblyNode:
+    __slots__ = ("name", "key")
 
-def _same_key(a: dict, b: dict) -> bool:
-    return str(a.get("key", "")).strip() == str(b.get("key", "")).strip()
+    def __init__(self, name: str, key: str) -> None:
+        self.name = name
+        self.key = key
 
-def _stable_wrap_outer(path: list, node: dict) -> list:
+    def get(self, field: str, default: Any = None) -> Any:
+        if field == "name":
+            return self.name
+        if field == "key":
+            return self.key
+        return default
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"name": self.name, "key": self.key}
+
+    def __repr__(self) -> str:
+        return f"_AssemblyNode(name={self.name!r}, key={self.key!r})"
+
+
+AssemblyLevel = Union[Dict[str, Any], _AssemblyNode]
+
+
+def _make_node(name: str, key: str) -> AssemblyLevel:
+    return _AssemblyNode(name, key) if USE_SLOTS_NODES else {"name": name, "key": key}
+
+
+def _level_key(lvl: AssemblyLevel) -> str:
+    return str(lvl.get("key", "")).strip()
+
+
+def _stable_wrap_outer(path: list, node: AssemblyLevel) -> list:
     """
     Make `node` the OUTERMOST level, stably.
 
     Rules:
-    - If node already exists anywhere in path -> remove it (dedupe)
     - Insert node at the front
-    - Collapse consecutive duplicates (trim, trim)
+    - Keep only the first occurrence of every key (node wins), so the
+      result has no duplicate levels at all (ordered-set, single pass)
     """
     if not isinstance(path, list):
         path = []
 
-    # 1) remove existing occurrences of same key
-    cleaned = []
+    seen = {_level_key(node)}
+    out = [node]
     for lvl in path:
-        if isinstance(lvl, dict) and _same_key(lvl, node):
-            continue
-        cleaned.append(lvl)
+        if isinstance(lvl, (dict, _AssemblyNode)):
+            k = _level_key(lvl)
+            if k in seen:
+                continue
+            seen.add(k)
+        out.append(lvl)
+    return out
 
-    # 2) insert as outermost
-    out = [node] + cleaned
 
-    # 3) collapse consecutive duplicates by key
-    collapsed = []
-    for lvl in out:
-        if not collapsed:
-            collapsed.append(lvl)
-            continue
-        prev = collapsed[-1]
-        if isinstance(prev, dict) and isinstance(lvl, dict) and _same_key(prev, lvl):
+# Path signature = tuple of (name, key) per level. Hashable, so the wrap/collapse
+# result can be memoized: leaves sharing the same incoming path (the common case
+# in one branch) pay for it once.
+PathSig = Tuple[Tuple[str, str], ...]
+
+_NODE_FIELDS = frozenset(("name", "key"))
+
+
+def _path_signature(path: list) -> Optional[PathSig]:
+    """
+    Return the (name, key) signature of a plain assembly_path, or None if any
+    level carries something else (not a node, extra fields, non-str values);
+    such paths go through the generic _stable_wrap_outer instead.
+    """
+    sig = []
+    for lvl in path:
+        if type(lvl) is _AssemblyNode:
+            nm = lvl.name
+            ky = lvl.key
+        elif type(lvl) is dict and lvl.keys() == _NODE_FIELDS:
+            nm = lvl["name"]
+            ky = lvl["key"]
+        else:
+            return None
+        if type(nm) is not str or type(ky) is not str:
+            return None
+        sig.append((nm, ky))
+    return tuple(sig)
+
+
+@lru_cache(maxsize=4096)
+def _stable_wrap_outer_cached(sig: PathSig, node: Tuple[str, str]) -> PathSig:
+    """Same rules as _stable_wrap_outer, on (name, key) signatures."""
+    seen = {node[1].strip()}
+    out = [node]
+    for nm, ky in sig:
+        k = ky.strip()
+        if k in seen:
             continue
-        collapsed.append(lvl)
+        seen.add(k)
+        out.append((nm, ky))
+    return tuple(out)
 
-    return collapsed
 
+@lru_cache(maxsize=4096)
+def _shared_node(name: str, key: str, slots: bool) -> AssemblyLevel:
+    """
+    Shared assembly node. Value-identical nodes are the same object across
+    payloads, so treat them as read-only downstream.
+    (`slots` is part of the cache key so toggling USE_SLOTS_NODES is honored.)
+    """
+    return _AssemblyNode(name, key) if slots else {"name": name, "key": key}
+
+
+# Payloads coming from build_matdata are owned by the MatData passed in, so they
+# are annotated in place. Set False to annotate shallow copies (payload + props)
+# and leave the incoming dicts untouched.
+ASSEMBLY_IN_PLACE = True
+
+# Per-call memo: id(incoming assembly_path list) -> (that list, wrapped result).
+# Leaves that share one incoming list (a whole branch annotated by a previous
+# call, or no path at all) are wrapped once and all get the same result list.
+# The memo keeps the keyed list alive, so its id cannot be reused mid-call.
+PathMemo = Dict[int, Tuple[list, list]]
 
+_EMPTY_PATH: list = []  # shared stand-in for "no assembly_path"; never mutated
 
-def _annotate_payload(payload: Payload, sub_name: str, key_suffix: Optional[str]) -> Payload:
-    p: Dict[str, Any] = dict(payload)  # defensive copy
+
+def _annotate_payload(
+    payload: Payload,
+    sub_name: str,
+    key_suffix: Optional[str],
+    memo: PathMemo,
+) -> Payload:
+    """Annotate `payload` (in place unless ASSEMBLY_IN_PLACE is False) and return it."""
+    p: Dict[str, Any] = cast(Dict[str, Any], payload) if ASSEMBLY_IN_PLACE else dict(payload)
     _normalize_payload_inplace(p)
 
-    props = _ensure_props(p)
+    props = p["props"]
+    if not ASSEMBLY_IN_PLACE:
+        props = dict(props)
+        p["props"] = props
 
     path = props.get("assembly_path")
     if not isinstance(path, list):
-        path = []
-        props["assembly_path"] = path
+        path = _EMPTY_PATH
+
+    hit = memo.get(id(path))
+    if hit is not None and hit[0] is path:
+        props["assembly_path"] = hit[1]
+        return cast(Payload, p)
+
+    key = _build_key_cached(sub_name, key_suffix) or sub_name
 
-    node = {
-        "name": sub_name,
-        "key": _build_key(sub_name, key_suffix) or sub_name,
-    }
+    sig = _path_signature(path)
+    if sig is None:
+        new_path = _stable_wrap_outer(path, _make_node(sub_name, key))
+    else:
+        new_sig = _stable_wrap_outer_cached(sig, (sub_name, key))
+        slots = USE_SLOTS_NODES
+        new_path = [_shared_node(nm, ky, slots) for nm, ky in new_sig]
 
-    props["assembly_path"] = _stable_wrap_outer(path, node)
+    memo[id(path)] = (path, new_path)
+    props["assembly_path"] = new_path
     return cast(Payload, p)
 
 
+def _annotated_item(item: Any, leaf: Any, sub_name: str, key_suffix: Optional[str], memo: PathMemo) -> Any:
+    """
+    Annotate `leaf` (= _unwrap(item)) and return what should sit in the
+    container. A wrapped payload annotated in place keeps its existing goo.
+    """
+    annotated = _annotate_payload(cast(Payload, leaf), sub_name, key_suffix, memo)
+    if annotated is leaf and leaf is not item:
+        return item
+    return _wrap(annotated)
+
+
 # ------------------------------------------------------------------------------
 # Walk MatData and annotate only valid Payload leaves
 # ------------------------------------------------------------------------------
 
-def _walk(obj: Any, sub_name: str, key_suffix: Optional[str]) -> Any:
+def _branch_has_candidate(items: Any) -> bool:
+    """
+    One cheap pass: can anything in `items` be (or contain) a payload?
+    Geometry-only branches (non-builder MatData) answer False and are skipped
+    without running the per-leaf unwrap + validation.
+    """
+    for e in items:
+        if isinstance(e, (list, tuple)) or isinstance(_unwrap(e), dict) or _is_datatree_like(e):
+            return True
+    return False
+
+
+def _extract_branches(tree: Any) -> List[List[Any]]:
+    """Pull every DataTree branch out once as a plain Python list."""
+    n = int(tree.BranchCount)
+    out: List[List[Any]] = [None] * n  # type: ignore[list-item]
+    for i in range(n):
+        out[i] = list(tree.Branch(i))
+    return out
+
+
+class _WalkFrame:
+    """One container on the _walk stack."""
+
+    __slots__ = ("items", "is_tuple", "dirty", "parent", "index", "opened")
+
+    def __init__(self, items: List[Any], is_tuple: bool, parent: Optional["_WalkFrame"], index: int) -> None:
+        self.items = items          # list patched in place (tuples: a working copy)
+        self.is_tuple = is_tuple    # rebuild as tuple in the parent if dirty
+        self.dirty = False          # a direct child was replaced
+        self.parent = parent
+        self.index = index          # slot in parent.items
+        self.opened = False         # children pushed -> next visit is post-order
+
+
+def _walk(obj: Any, sub_name: str, key_suffix: Optional[str], memo: PathMemo) -> Any:
+    """
+    Iterative MatData walk (explicit stack, no recursion).
+
+    - lists are updated IN PLACE (only changed leaves are overwritten)
+    - tuples are immutable: they are rebuilt only if a descendant changed
+    - DataTrees become List[List[Any]] (branches extracted once)
+    """
     if obj is None:
         return None
 
     if _is_datatree_like(obj):
-        out: List[List[Any]] = []
-        for i in range(int(obj.BranchCount)):
-            br = obj.Branch(i)
-            out.append([_walk(it, sub_name, key_suffix) for it in br])
-        return out
+        obj = _extract_branches(obj)
+    elif not isinstance(obj, (list, tuple)):
+        leaf = _unwrap(obj)
+        if _is_payload_fast(leaf) and is_payload(leaf):
+            return _annotated_item(obj, leaf, sub_name, key_suffix, memo)
+        return obj
+
+    root = _WalkFrame(obj if isinstance(obj, list) else list(obj), isinstance(obj, tuple), None, -1)
+    stack: List[_WalkFrame] = [root]
+
+    # lists are patched in place, so one that appears twice (shared branch,
+    # or referenced from a tuple wrapper) needs no second visit
+    seen_lists = {id(root.items)}
+
+    while stack:
+        frame = stack[-1]
+        items = frame.items
+
+        if frame.opened:
+            # post-order: children are done, rebuild tuple if needed
+            stack.pop()
+            parent = frame.parent
+            if parent is not None and frame.is_tuple and frame.dirty:
+                parent.items[frame.index] = tuple(items)
+                if parent.is_tuple:
+                    parent.dirty = True
+            continue
+
+        frame.opened = True
+        if not _branch_has_candidate(items):
+            continue
+
+        for i, it in enumerate(items):
+            if it is None:
+                continue
+
+            if _is_datatree_like(it):
+                it = _extract_branches(it)
+                items[i] = it
+                if frame.is_tuple:
+                    frame.dirty = True
+
+            if isinstance(it, list):
+                if id(it) not in seen_lists:
+                    seen_lists.add(id(it))
+                    stack.append(_WalkFrame(it, False, frame, i))
+                continue
+            if isinstance(it, tuple):
+                stack.append(_WalkFrame(list(it), True, frame, i))
+                continue
+
+            leaf = _unwrap(it)
+            if _is_payload_fast(leaf) and is_payload(leaf):
+                new_it = _annotated_item(it, leaf, sub_name, key_suffix, memo)
+                if new_it is not it:
+                    items[i] = new_it
+                    if frame.is_tuple:
+                        frame.dirty = True
+
+    if root.is_tuple:
+        return tuple(root.items) if root.dirty else obj
+    return obj
 
-    if isinstance(obj, list):
-        return [_walk(it, sub_name, key_suffix) for it in obj]
-    if isinstance(obj, tuple):
-        return tuple(_walk(it, sub_name, key_suffix) for it in obj)
 
-    leaf = _unwrap(obj)
+def _is_matdata_2lvl(obj: Any) -> bool:
+    """Builder-shaped MatData: List[List[wrapped_payload]]."""
+    return isinstance(obj, list) and bool(obj) and isinstance(obj[0], list)
 
-    if is_payload(leaf):
-        pl = cast(Payload, leaf)
-        annotated = _annotate_payload(pl, sub_name, key_suffix)
-        return _wrap(annotated)
 
+def _walk_matdata_2lvl(obj: List[Any], sub_name: str, key_suffix: Optional[str], memo: PathMemo) -> List[Any]:
+    """
+    Fast path for the shape build_matdata produces (outer list of branch lists).
+    No per-item container dispatch; anything deeper than expected is handed to
+    the generic _walk, so other shapes remain correct.
+    """
+    for bi, branch in enumerate(obj):
+        if type(branch) is not list:
+            obj[bi] = _walk(branch, sub_name, key_suffix, memo)
+            continue
+        if not _branch_has_candidate(branch):
+            continue
+        for i, item in enumerate(branch):
+            leaf = _unwrap(item)
+            if _is_payload_fast(leaf):
+                if is_payload(leaf):
+                    new_item = _annotated_item(item, leaf, sub_name, key_suffix, memo)
+                    if new_item is not item:
+                        branch[i] = new_item
+            elif isinstance(item, (list, tuple)) or _is_datatree_like(item):
+                # nested container: same handling as inside _walk (goo is never unwrapped here)
+                new_item = _walk(item, sub_name, key_suffix, memo)
+                if new_item is not item:
+                    branch[i] = new_item
     return obj
 
 
@@ -207,6 +471,7 @@ def _walk(obj: Any, sub_name: str, key_suffix: Optional[str]) -> Any:
 # ------------------------------------------------------------------------------
 
 def annotate_subassembly(MatData: Any, Name: Any, KeySuffix: Any = None) -> Tuple[Any, str]:
+    # canonicalize once; helpers below treat sub_name/key_suffix as final
     sub_name = str(Name).strip() if Name is not None else ""
     if not sub_name:
         return MatData, "assembly(auto): empty Name -> no changes."
@@ -216,7 +481,11 @@ def annotate_subassembly(MatData: Any, Name: Any, KeySuffix: Any = None) -> Tupl
         ks = str(KeySuffix).strip()
         key_suffix = ks if ks else None
 
-    new_matdata = _walk(MatData, sub_name, key_suffix)
+    memo: PathMemo = {}
+    if _is_matdata_2lvl(MatData):
+        new_matdata = _walk_matdata_2lvl(MatData, sub_name, key_suffix, memo)
+    else:
+        new_matdata = _walk(MatData, sub_name, key_suffix, memo)
 
     return new_matdata, (
         "assembly(auto): applied. "
@@ -7,7 +7,7 @@ Build a Grasshopper-friendly "MatData" payload from flexible inputs
 
 Output shape:
 - MatData = List[List[wrapped_payload]]
-  - outer list  : branches (sorted by path string)
+  - outer list  : branches (sorted numerically by path indices)
   - inner list  : items in that branch
   - leaf item   : payload dict (wrapped into GH_ObjectWrapper if available)
 
@@ -18,12 +18,13 @@ This file is designed to pair with an exporter:
 
 from __future__ import annotations
 
-from typing import Any, Dict, List, Mapping, Tuple, cast
+from sys import intern, maxsize
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, cast
 
 # ---------------------------------------------------------------------
 # Shared type contracts (Scheme A: keep this file in the same folder)
 # ---------------------------------------------------------------------
-from ifc_types import AnyInput, BranchDict, GHDataTreeLike, PathStr, Payload
+from ifc_types import AnyInput, BranchDict, GHDataTreeLike, PathKey, PathStr, Payload
 
 # -----------------------------------------------------------------------------
 # Optional GH wrapper (safe import)
@@ -54,6 +55,18 @@ def _wrap_payload(payload: Payload) -> Any:
     return GH_ObjectWrapper(payload)
 
 
+# Unwrap GH goo -> underlying Python value. Bound once at import time (same
+# pattern as ifc_assembly._unwrap), so per-leaf calls carry no None check.
+if GH_ObjectWrapper is not None:
+    def _unwrap(x: Any) -> Any:
+        if isinstance(x, GH_ObjectWrapper):  # type: ignore
+            return getattr(x, "Value", x)
+        return x
+else:
+    def _unwrap(x: Any) -> Any:
+        return x
+
+
 # -----------------------------------------------------------------------------
 # Core utilities
 # -----------------------------------------------------------------------------
@@ -71,15 +84,101 @@ def is_tree_like(x: Any) -> bool:
     )
 
 
-def to_branch_dict_any(x: AnyInput) -> Tuple[BranchDict, List[PathStr]]:
+class _BranchView(Sequence[Any]):
+    """
+    Lazy, read-only view over one DataTree branch.
+
+    Iterates `tree.Branch(path)` on demand instead of copying the .NET
+    collection into a Python list up front.
+    """
+    __slots__ = ("tree", "path")
+
+    def __init__(self, tree: GHDataTreeLike, path: Any) -> None:
+        self.tree = tree
+        self.path = path
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.tree.Branch(self.path))
+
+    def __len__(self) -> int:
+        # GH branches are .NET IList: len() maps to .Count, no copy
+        return len(self.tree.Branch(self.path))  # type: ignore[arg-type]
+
+    def __getitem__(self, i: Any) -> Any:
+        return self.tree.Branch(self.path)[i]  # type: ignore[index]
+
+
+# Internal branch dict: keyed by PathKey instead of PathStr.
+KeyedBranchDict = Dict[PathKey, Sequence[Any]]
+
+_ROOT_KEY: PathKey = (0,)
+
+
+def _path_sort_key(key: PathKey) -> PathKey:
+    """
+    Numeric per index ({0;2} before {0;10}), but a path still sorts AFTER the
+    paths it prefixes ({0;0} before {0}), as the old "{0;0}" < "{0}" string
+    order did. Keeps a broadcast-only {0} (list/scalar UnitId or Category)
+    from being inserted in front of the Obj branches.
+    """
+    return key + (maxsize,)
+
+
+def path_key(path_obj: Any) -> PathKey:
+    """
+    GH_Path -> int tuple, read from `.Indices` (no string round-trip).
+    Objects without Indices are parsed from their "{0;1}" string form.
+    """
+    idx = getattr(path_obj, "Indices", None)
+    if idx is not None:
+        return tuple(int(i) for i in idx)
+    s = str(path_obj).strip().strip("{}")
+    return tuple(int(t) for t in s.split(";")) if s else ()
+
+
+def path_to_str(key: PathKey) -> PathStr:
+    """PathKey -> GH style "{0;1}" (logs / messages / public str-keyed API)."""
+    return "{" + ";".join(str(i) for i in key) + "}"
+
+
+def _branch_dict(x: AnyInput, path_cache: Dict[Any, PathKey]) -> KeyedBranchDict:
+    """PathKey-keyed branch dict (no sorted path list); see to_branch_dict_any."""
+    branches: KeyedBranchDict = {}
+
+    # Case 1: Grasshopper DataTree
+    if is_tree_like(x):
+        tree = cast(GHDataTreeLike, x)
+        for i in range(int(tree.BranchCount)):
+            path_obj = tree.Path(i)
+            k = path_cache.get(path_obj)
+            if k is None:
+                k = path_key(path_obj)
+                path_cache[path_obj] = k
+            branches[k] = _BranchView(tree, path_obj)
+        return branches
+
+    # Case 2: Python sequence -> one branch
+    if isinstance(x, (list, tuple)):
+        branches[_ROOT_KEY] = list(x)
+        return branches
+
+    # Case 3: scalar -> one branch with one item
+    branches[_ROOT_KEY] = [x]
+    return branches
+
+
+def to_branch_dict_any(
+    x: AnyInput,
+    path_cache: Optional[Dict[Any, PathKey]] = None,
+) -> Tuple[BranchDict, List[PathStr]]:
     """
     Normalize an input into a (branch_dict, paths) pair.
 
     Supported inputs:
     1) GH DataTree-like
        - each tree path becomes a dict key (string)
-       - each branch becomes a Python list
-       - returns all discovered paths (sorted)
+       - each branch becomes a lazy _BranchView (sequence view, not a list copy)
+       - returns all discovered paths (sorted numerically by path indices)
 
     2) list/tuple (Sequence)
        - treated as a single branch "{0}"
@@ -88,52 +187,106 @@ def to_branch_dict_any(x: AnyInput) -> Tuple[BranchDict, List[PathStr]]:
     3) scalar
        - treated as a single branch "{0}" containing that one item
        - returns one path ["{0}"]
+
+    path_cache:
+      optional {GH_Path: PathKey} dict shared by several calls. GH_Path compares
+      by value, so equal paths in different trees hit the same entry and the
+      path is read from .NET only once per distinct path.
+
+    Note: build_matdata works on PathKey internally; this str-keyed form is
+    kept for external callers.
     """
+    keyed = _branch_dict(x, path_cache if path_cache is not None else {})
     branches: BranchDict = {}
     paths: List[PathStr] = []
+    for k in sorted(keyed, key=_path_sort_key):
+        p = path_to_str(k)
+        branches[p] = keyed[k]
+        paths.append(p)
+    return branches, paths
 
-    # Case 1: Grasshopper DataTree
-    if is_tree_like(x):
-        tree = cast(GHDataTreeLike, x)
-        for i in range(int(tree.BranchCount)):
-            path_obj = tree.Path(i)
-            p = str(path_obj)  # normalize to stable string key, e.g. "{0;1}"
-            branches[p] = list(tree.Branch(path_obj))
-            paths.append(p)
-        paths.sort()
-        return branches, paths
-
-    # Case 2: Python sequence -> one branch
-    if isinstance(x, (list, tuple)):
-        branches["{0}"] = list(x)
-        return branches, ["{0}"]
-
-    # Case 3: scalar -> one branch with one item
-    branches["{0}"] = [x]
-    return branches, ["{0}"]
 
+def _build_branch_dicts(*inputs: AnyInput) -> Tuple[Tuple[KeyedBranchDict, ...], List[PathKey]]:
+    """
+    One pass over several inputs (Obj/Category/UnitId):
+    - one shared path cache (each distinct path is read from .NET once)
+    - one key universe (all paths seen in any input), sorted once
 
-def get_branch(
-    branch_dict: Mapping[PathStr, List[Any]],
-    path: PathStr,
-    fallback_path: PathStr = "{0}",
-) -> List[Any]:
+    Branch dicts stay sparse on purpose: a missing path must still fall back
+    to {0} in _get_branch_view (single Category/UnitId broadcast).
+    """
+    path_cache: Dict[Any, PathKey] = {}
+    universe: set = set()
+    dicts: List[KeyedBranchDict] = []
+    for x in inputs:
+        d = _branch_dict(x, path_cache)
+        universe.update(d)
+        dicts.append(d)
+    return tuple(dicts), sorted(universe, key=_path_sort_key)
+
+
+def _get_branch_view(
+    branch_dict: Mapping[Any, Sequence[Any]],
+    path: Any,
+    fallback_path: Any = _ROOT_KEY,
+) -> Sequence[Any]:
     """
-    Get branch items by path; broadcast fallback "{0}" if needed.
+    Get branch items by path; broadcast fallback {0} if needed.
+    Works for both PathKey-keyed (internal) and PathStr-keyed dicts.
 
     Typical GH use-case this supports:
     - Geo is a DataTree with many branches, but Category/UnitId is a single item.
       In that case Category/UnitId should "broadcast" to every Geo branch.
 
     Returns:
-    - a COPY of the branch list (safe against accidental in-place mutation)
-    - empty list if neither path exists
+    - the stored branch itself (list or _BranchView), NOT a copy.
+      Non-owning: callers must not mutate it.
+    - empty tuple if neither path exists
     """
     if path in branch_dict:
-        return list(branch_dict[path])
+        return branch_dict[path]
     if fallback_path in branch_dict:
-        return list(branch_dict[fallback_path])
-    return []
+        return branch_dict[fallback_path]
+    return ()
+
+
+def get_branch(
+    branch_dict: Mapping[PathStr, Sequence[Any]],
+    path: PathStr,
+    fallback_path: PathStr = "{0}",
+) -> List[Any]:
+    """Same lookup as _get_branch_view, but returns an owned list COPY."""
+    return list(_get_branch_view(branch_dict, path, fallback_path))
+
+
+# -----------------------------------------------------------------------------
+# Payload templates
+# -----------------------------------------------------------------------------
+# Leaves are built by copying these instead of writing every key from scratch.
+# The nested bags are copied per payload as well, so each payload still owns
+# its own dims/material/finish dicts.
+_PROPS_TEMPLATE: Dict[str, Any] = {
+    "part_no": None,
+    "source_guid": None,
+
+    # keep same reserved bags as your old builder
+    "dims": None,
+    "material": None,
+    "finish": None,
+    "color_code": None,
+}
+_DIMS_TEMPLATE: Dict[str, Any] = {"L": None, "W": None, "R": None}
+_MATERIAL_TEMPLATE: Dict[str, Any] = {"name": None}
+_FINISH_TEMPLATE: Dict[str, Any] = {"type": None, "thickness_um": None}
+
+_PAYLOAD_TEMPLATE: Dict[str, Any] = {
+    "schema": 1,
+    "unit_id": "",
+    "geo": None,
+    "name": "",
+    "category": "",
+    "props": None,
+}
 
 
 # -----------------------------------------------------------------------------
@@ -155,43 +308,47 @@ def build_matdata(
       List[branch] where each branch is List[GH_ObjectWrapper(payload_dict)]
     """
 
-    ObjD, ObjP = to_branch_dict_any(Obj)
-    CatD, CatP = to_branch_dict_any(Category)
-    UidD, UidP = to_branch_dict_any(UnitId)
-    all_paths: List[PathStr] = sorted(set(ObjP) | set(UidP) | set(CatP))
-
-    try:
-        from Grasshopper.Kernel.Types import GH_ObjectWrapper  # type: ignore
-    except Exception:
-        GH_ObjectWrapper = None  # type: ignore
-
-    def _unwrap(x: Any) -> Any:
-        if GH_ObjectWrapper is not None and isinstance(x, GH_ObjectWrapper):  # type: ignore
-            return getattr(x, "Value", x)
-        return x
+    (ObjD, CatD, UidD), all_paths = _build_branch_dicts(Obj, Category, UnitId)
 
     out: List[List[Any]] = []
     logs: List[str] = []
+    schema = int(schema_version)
 
-    for p in all_paths:
-        objs = list(ObjD.get(p, []))   # 沒有就 []
-        us = get_branch(UidD, p)
-        if not us:
-            raise Exception(f"[{p}] UnitId is required (missing branch and no fallback {{0}}).")
-        unit_id = str(us[0])
-
-        cs = get_branch(CatD, p)
-        cat_value = default_category if not cs else str(cs[0])
+    # one shared str object per distinct part_no (repeats are common: same
+    # profile on many parts); scoped to this call so it never grows unbounded
+    part_no_pool: Dict[str, str] = {}
 
-        branch_items: List[Any] = []
-        payload_count = 0
+    for p in all_paths:
+        objs = ObjD.get(p, ())   # 沒有就 ()
+        # only the first item of UnitId / Category is used: read it from the view
+        try:
+            first_uid = next(iter(_get_branch_view(UidD, p)))
+        except StopIteration:
+            raise Exception(f"[{path_to_str(p)}] UnitId is required (missing branch and no fallback {{0}}).")
+        unit_id = intern(str(first_uid))
+
+        try:
+            first_cat = next(iter(_get_branch_view(CatD, p)))
+            cat_value = intern(str(first_cat))
+        except StopIteration:
+            cat_value = intern(default_category)
+
+        # branch-invariant keys are filled once; leaves copy this
+        branch_template = _PAYLOAD_TEMPLATE.copy()
+        branch_template["schema"] = schema
+        branch_template["unit_id"] = unit_id
+        branch_template["category"] = cat_value
+
+        # exact size is known up front: fill by index instead of growing
+        payload_count = len(objs)
+        branch_items: List[Any] = [None] * payload_count
 
         for k, obj_item in enumerate(objs):
             pair = _unwrap(obj_item)
 
             # Expect [geo, raw_name]
             if not isinstance(pair, (list, tuple)) or len(pair) < 2:
-                raise Exception(f"[{p}] Obj leaf[{k}] must be [geo, raw_name]. Got: {type(pair)}")
+                raise Exception(f"[{path_to_str(p)}] Obj leaf[{k}] must be [geo, raw_name]. Got: {type(pair)}")
 
             geo = pair[0]
             raw_name = str(pair[1])
@@ -201,32 +358,24 @@ def build_matdata(
                 part_no, source_guid = raw_name.rsplit("_", 1)
             else:
                 part_no, source_guid = raw_name, None
+            part_no = part_no_pool.setdefault(part_no, part_no)
+
+            props = _PROPS_TEMPLATE.copy()
+            props["part_no"] = part_no
+            props["source_guid"] = source_guid
+            props["dims"] = _DIMS_TEMPLATE.copy()
+            props["material"] = _MATERIAL_TEMPLATE.copy()
+            props["finish"] = _FINISH_TEMPLATE.copy()
+
+            payload = cast(Payload, branch_template.copy())
+            payload["geo"] = geo            # <-- guaranteed single geometry now
+            payload["name"] = part_no
+            payload["props"] = props
 
-            props: Dict[str, Any] = {
-                "part_no": part_no,
-                "source_guid": source_guid,
-
-                # keep same reserved bags as your old builder
-                "dims": {"L": None, "W": None, "R": None},
-                "material": {"name": None},
-                "finish": {"type": None, "thickness_um": None},
-                "color_code": None,
-            }
-
-            payload: Payload = {
-                "schema": int(schema_version),
-                "unit_id": unit_id,
-                "geo": geo,            # <-- guaranteed single geometry now
-                "name": part_no,
-                "category": cat_value,
-                "props": props,
-            }
-
-            branch_items.append(_wrap_payload(payload))
-            payload_count += 1
+            branch_items[k] = _wrap_payload(payload)
 
         out.append(branch_items)
-        logs.append(f"{p} -> Unit {unit_id}: payloads={payload_count} | Cat={cat_value}")
+        logs.append(f"{path_to_str(p)} -> Unit {unit_id}: payloads={payload_count} | Cat={cat_value}")
 
     return out, "\n".join(logs)
 
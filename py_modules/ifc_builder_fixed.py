@@ -18,7 +18,7 @@ This file is designed to pair with an exporter:
 
 from __future__ import annotations
 
-from typing import Any, Dict, List, Mapping, Tuple, cast
+from typing import Any, Dict, List, Mapping, Sequence, Tuple, cast
 
 # ---------------------------------------------------------------------
 # Shared type contracts (Scheme A: keep this file in the same folder)
@@ -114,7 +114,7 @@ def to_branch_dict_any(x: AnyInput) -> Tuple[BranchDict, List[PathStr]]:
 
 
 def get_branch(
-    branch_dict: Mapping[PathStr, List[Any]],
+    branch_dict: Mapping[PathStr, Sequence[Any]],
     path: PathStr,
     fallback_path: PathStr = "{0}",
 ) -> List[Any]:
@@ -1,5 +1,5 @@
 # ifc_bulk_builder.py
-from typing import Any, List, Tuple
+from typing import Any, Dict, List, Tuple
 from Grasshopper import DataTree # type: ignore
 from Grasshopper.Kernel.Data import GH_Path # type: ignore
 
@@ -11,6 +11,25 @@ def _is_pair(x: Any) -> bool:
         and len(x) == 2
     )
 
+
+def _make_bulk_payload(
+    item: Any,
+    schema: int,
+    cat: str,
+    bulk_props: Dict[str, Any],
+) -> Payload:
+    geo, name = item
+    return {
+        "schema": schema,
+        # 注意：Bulk 沒有 unit 概念，但為了 payload 契約一致，仍給一個佔位值
+        "unit_id": "__BULK__",
+        "name": str(name),
+        "category": cat,
+        "geo": geo,
+        "props": bulk_props.copy(),
+    }
+
+
 def build_bulk_matdata(
     Obj: Any,
     Category: Any,
@@ -40,57 +59,33 @@ def build_bulk_matdata(
     if not container_id:
         raise Exception("bulk_builder: BulkContainerId is required.")
 
+    # built once; each payload gets its own shallow copy because downstream
+    # (ifc_assembly) writes props["assembly_path"] in place
+    bulk_props: Dict[str, Any] = {
+        "scope": "BULK",
+        "container_id": container_id,
+    }
+    schema = int(SchemaVersion)
+
     matdata: List[Payload] = []
-    count = 0
 
     # 支援 Tree / List / 單一輸入
     if hasattr(Obj, "BranchCount"):
-        # DataTree
+        # DataTree: branch index is kept so a bad leaf reports its path
         for bi in range(Obj.BranchCount):
-            branch = Obj.Branch(bi)
-            path = Obj.Path(bi)
-
-            for item in branch:
+            for item in Obj.Branch(bi):
                 if not _is_pair(item):
                     raise Exception(
-                        f"bulk_builder: invalid leaf at path {path}: {item}"
+                        f"bulk_builder: invalid leaf at path {Obj.Path(bi)}: {item}"
                     )
-
-                geo, name = item
-                payload: Payload = {
-                    "schema": int(SchemaVersion),
-                    # 注意：Bulk 沒有 unit 概念，但為了 payload 契約一致，仍給一個佔位值
-                    "unit_id": "__BULK__",
-                    "name": str(name),
-                    "category": cat,
-                    "geo": geo,
-                    "props": {
-                        "scope": "BULK",
-                        "container_id": container_id,
-                    },
-                }
-                matdata.append(payload)
-                count += 1
-
+                matdata.append(_make_bulk_payload(item, schema, cat, bulk_props))
     else:
         # 非 Tree，當作 list
         for item in Obj:
             if not _is_pair(item):
                 raise Exception(f"bulk_builder: invalid leaf: {item}")
+            matdata.append(_make_bulk_payload(item, schema, cat, bulk_props))
 
-            geo, name = item
-            payload: Payload = {
-                "schema": int(SchemaVersion),
-                "unit_id": "__BULK__",
-                "name": str(name),
-                "category": cat,
-                "geo": geo,
-                "props": {
-                    "scope": "BULK",
-                    "container_id": container_id,
-                },
-            }
-            matdata.append(payload)
-            count += 1
+    count = len(matdata)
 
     return matdata, f"bulk_builder: created {count} BULK payloads (container={container_id})."
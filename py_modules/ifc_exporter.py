@@ -34,170 +34,815 @@ Design principles
 4) Multi-level assembly strategy (UPDATED: supports multi-level):
    - Sub-assemblies are read from:
        payload["props"]["assembly_path"] = [{"name": "...", "key": "..."}, ...]
-     appended by ifc_assembly.py (AUTO WRAP / multi-level).
+     appended by ifc_assembly.py (AUTO WRAP / multi-level). Levels may be
+     plain dicts or ifc_assembly slot nodes (same name/key fields).
    - Elements are assigned to the deepest assembly node if assembly_path exists;
      otherwise assigned directly to the container.
 """
 
 from __future__ import annotations
 
+import hashlib
+import importlib
 import os
-import traceback
-from typing import Any, Dict, Iterator, List, Optional, Tuple
+from collections import Counter, defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
+from itertools import chain
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 from ifc_types import Payload
 
+# Rhino / ifcopenshell resolved once per GH session (module import), not per solve.
+# Outside Rhino the module still imports; export_ifc_from_matdata reports the error.
+try:
+    import Rhino.Geometry as rg  # type: ignore
+    import ifcopenshell  # type: ignore
+    from ifcopenshell.api import run as ifc_run  # type: ignore
+    _IMPORT_ERROR: Optional[BaseException] = None
+except ImportError as _e:
+    rg = None  # type: ignore
+    ifcopenshell = None  # type: ignore
+    ifc_run = None  # type: ignore
+    _IMPORT_ERROR = _e
+
+try:
+    from Grasshopper.Kernel.Types import GH_ObjectWrapper  # type: ignore
+except Exception:
+    GH_ObjectWrapper = None  # type: ignore
+
+# DataTree<T> / GH_Structure interfaces: one isinstance check per node instead of two hasattr probes
+try:
+    from Grasshopper.Kernel.Data import IGH_DataTree, IGH_Structure  # type: ignore
+    _GH_TREE_TYPES: Tuple[type, ...] = (IGH_DataTree, IGH_Structure)
+except Exception:
+    _GH_TREE_TYPES = ()
+
+if _GH_TREE_TYPES:
+    def _is_datatree_like(x: Any) -> bool:
+        return isinstance(x, _GH_TREE_TYPES)
+else:
+    # outside GH: duck-typed, as before
+    def _is_datatree_like(x: Any) -> bool:
+        return x is not None and hasattr(x, "BranchCount") and hasattr(x, "Branch")
+
+# numpy is optional (not bundled with every Rhino/GH install)
+try:
+    import numpy as np  # type: ignore
+    HAS_NUMPY = True
+except Exception:
+    np = None  # type: ignore
+    HAS_NUMPY = False
+
+# Optional vertex weld + degenerate-triangle filter (numba kernel, np.unique fallback inside; needs numpy)
+try:
+    from ifc_exporter_numba import weld_mesh  # type: ignore
+except Exception:
+    weld_mesh = None  # type: ignore
+
+
+def _np_from_net(arr: Any, dtype: Any) -> Any:
+    """.NET primitive array -> 1D ndarray (buffer protocol when pythonnet exposes it, else one fromiter pass)."""
+    try:
+        return np.frombuffer(arr, dtype=dtype)
+    except Exception:
+        return np.fromiter(arr, dtype=dtype, count=len(arr))
+
+
+# normalized assembly_path: ((name, key), ...) outermost first
+AsmPath = Tuple[Tuple[str, str], ...]
+
+# normalized category -> IFC class (everything else: IfcBuildingElementProxy)
+_CAT2CLS: Dict[str, str] = {
+    "vertical": "IfcMember",
+    "horizontal": "IfcBeam",
+}
+
+# (verts, faces, content digest) produced by the meshing pass;
+# faces are the 1-based CoordIndex when TESSELLATED_BODY, else 0-based for add_mesh_representation
+MeshData = Tuple[List[Any], List[Any], bytes]
+
+# body geometry: IfcTriangulatedFaceSet (True) or legacy IfcFacetedBrep via add_mesh_representation (False)
+TESSELLATED_BODY = True
+
+# mesh payloads in a thread pool before the (serial) IFC writes
+PARALLEL_MESHING = True
+
+# weld coincident vertices / drop degenerate triangles on the numpy path (fewer IFC points)
+WELD_VERTICES = True
+
+# vertex coordinates rounded to this many decimals (mm -> 1e-3 = micrometre); None keeps them as read.
+# Rhino vertices are float32: widened to float64 they print as e.g. 12.300000190734863 in STEP
+COORD_DECIMALS: Optional[int] = 3
+
 
 # ---------------------------------------------------------------------
-# Public API (DO NOT CHANGE signature)
+# ifcopenshell.api direct functions (resolved once per session)
 # ---------------------------------------------------------------------
-def export_ifc_from_matdata(
-    Run: bool,
-    MatData: Any,
-    StoreyName: Any,
-    StoreyElev: Any,
-    OutPath: Any,
-) -> Tuple[bool, str, Optional[str]]:
-    if not Run:
-        return False, "Run=False", None
+_API_FUNCS: Dict[str, Callable[..., Any]] = {}
 
-    OK: bool = False
-    Log: str = ""
 
+def _api(usecase: str) -> Callable[..., Any]:
+    """
+    Return the plain function behind `ifcopenshell.api.run(usecase, ...)`.
+    Newer ifcopenshell exposes e.g. ifcopenshell.api.root.create_entity(file, **kw);
+    older builds only have the usecase sub-module -> fall back to api.run.
+    """
+    fn = _API_FUNCS.get(usecase)
+    if fn is not None:
+        return fn
+
+    mod_name, fn_name = usecase.split(".", 1)
     try:
-        import Rhino.Geometry as rg
+        fn = getattr(importlib.import_module("ifcopenshell.api." + mod_name), fn_name)
+        if not callable(fn):
+            raise TypeError(usecase)
+    except Exception:
+        def fn(model: Any, **kwargs: Any) -> Any:
+            return ifc_run(usecase, model, **kwargs)
 
-        import ifcopenshell  # type: ignore
-        from ifcopenshell.api import run as ifc_run  # type: ignore
+    _API_FUNCS[usecase] = fn
+    return fn
 
-        # ---------------------------------------------------------------------
-        # Debug helpers
-        # ---------------------------------------------------------------------
-        def tname(x: Any) -> str:
-            try:
-                return x.GetType().FullName  # type: ignore[attr-defined]
-            except Exception:
-                try:
-                    return str(type(x))
-                except Exception:
-                    return "<unknown-type>"
 
-        # ---------------------------------------------------------------------
-        # OutPath normalization
-        # ---------------------------------------------------------------------
-        def normalize_outpath(out_path: Any, storey_name: str) -> str:
-            p = str(out_path).strip().strip('"')
-            if p == "":
-                p = "."
-            ext = os.path.splitext(p)[1]
+# ---------------------------------------------------------------------
+# Body representation
+# ---------------------------------------------------------------------
+def _add_triangulated_representation(model: Any, context: Any, verts: List[Any], coord_index: List[Any]) -> Any:
+    """
+    One IfcTriangulatedFaceSet (point list + index buffer) instead of an IfcFacetedBrep
+    with one IfcFace/IfcPolyLoop per triangle. `coord_index` is already 1-based (built by _mesh_payload).
+    """
+    points = model.create_entity("IfcCartesianPointList3D", CoordList=verts)
+    face_set = model.create_entity(
+        "IfcTriangulatedFaceSet",
+        Coordinates=points,
+        CoordIndex=coord_index,
+        Closed=False,
+    )
+    return model.create_entity(
+        "IfcShapeRepresentation",
+        ContextOfItems=context,
+        RepresentationIdentifier="Body",
+        RepresentationType="Tessellation",
+        Items=[face_set],
+    )
+
+
+class _BodyShape:
+    """
+    Body representation for one mesh digest.
+    One user: the representation is assigned directly (owner).
+    Two or more: it lives in an IfcRepresentationMap and every user gets its own
+    MappedRepresentation (IFC4 IfcShapeModel.WR11: one product or map per representation).
+    """
+
+    __slots__ = ("rep", "owner", "rep_map")
+
+    def __init__(self, rep: Any, owner: Any) -> None:
+        self.rep = rep
+        self.owner = owner
+        self.rep_map: Any = None
+
+
+def _mapped_representation(model: Any, context: Any, rep_map: Any, target: Any) -> Any:
+    """Per-product Body representation: one IfcMappedItem instancing `rep_map` at `target`."""
+    item = model.create_entity("IfcMappedItem", MappingSource=rep_map, MappingTarget=target)
+    return model.create_entity(
+        "IfcShapeRepresentation",
+        ContextOfItems=context,
+        RepresentationIdentifier="Body",
+        RepresentationType="MappedRepresentation",
+        Items=[item],
+    )
 
-            if os.path.isdir(p) or ext == "":
-                out_dir = p
-                if not os.path.exists(out_dir):
-                    os.makedirs(out_dir, exist_ok=True)
-                return os.path.join(out_dir, f"{storey_name}_multi_units.ifc")
 
-            out_dir = os.path.dirname(p)
-            if out_dir and not os.path.exists(out_dir):
-                os.makedirs(out_dir, exist_ok=True)
+# ---------------------------------------------------------------------
+# Output
+# ---------------------------------------------------------------------
+_WRITE_CHUNK = 1024 * 1024
+_WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+
 
-            root, ext2 = os.path.splitext(p)
-            return (root + ".ifc") if ext2.lower() != ".ifc" else p
+def _write_ifc(model: Any, path: str) -> None:
+    """
+    Serialize once, then write the bytes with raw os.write in 1 MB chunks
+    (a handful of syscalls, no Python file-object layer). Falls back to model.write.
+    """
+    try:
+        data = model.wrapped_data.to_string()
+    except Exception:
+        model.write(path)
+        return
+
+    buf = memoryview(data.encode("utf-8"))
+    del data
+    fd = os.open(path, _WRITE_FLAGS, 0o666)
+    try:
+        pos, end = 0, len(buf)
+        while pos < end:
+            # os.write may write less than asked -> advance by the returned count
+            pos += os.write(fd, buf[pos:pos + _WRITE_CHUNK])
+    finally:
+        os.close(fd)
 
-        ResolvedOutPath: str = normalize_outpath(OutPath, str(StoreyName))
 
-        # ---------------------------------------------------------------------
-        # GH goo / payload helpers
-        # ---------------------------------------------------------------------
+# ---------------------------------------------------------------------
+# Debug helpers
+# ---------------------------------------------------------------------
+def _tname(x: Any) -> str:
+    try:
+        return x.GetType().FullName  # type: ignore[attr-defined]
+    except Exception:
         try:
-            from Grasshopper.Kernel.Types import GH_ObjectWrapper  # type: ignore
+            return str(type(x))
         except Exception:
-            GH_ObjectWrapper = None  # type: ignore
+            return "<unknown-type>"
+
+
+# ---------------------------------------------------------------------
+# GH goo / payload helpers
+# ---------------------------------------------------------------------
+def _unwrap_payload(x: Any) -> Payload:
+    if GH_ObjectWrapper is not None and isinstance(x, GH_ObjectWrapper):  # type: ignore
+        x = getattr(x, "Value", x)
+
+    if not isinstance(x, dict):
+        raise TypeError(f"MatData item is not dict/goo(dict). Got {_tname(x)}")
+
+    if "unit_id" not in x:
+        raise KeyError("Payload missing required key: 'unit_id'")
+    if "name" not in x:
+        raise KeyError("Payload missing required key: 'name'")
+    if "geo" not in x:
+        raise KeyError("Payload missing required key: 'geo'")
+
+    # str-normalized once here; downstream reads use the values directly
+    if not isinstance(x["name"], str):
+        x["name"] = str(x["name"])
+
+    uid = x["unit_id"]
+    if uid is not None and not isinstance(uid, str):
+        x["unit_id"] = str(uid)
+
+    cat = x.get("category")
+    if cat is None:
+        x["category"] = "Unspecified"
+    elif not isinstance(cat, str):
+        x["category"] = str(cat)
+
+    if "props" not in x or x["props"] is None:
+        x["props"] = {}
+
+    if "schema" not in x or x["schema"] is None:
+        x["schema"] = 1
+
+    return x  # type: ignore[return-value]
+
+
+def _iter_payloads(obj: Any) -> Iterator[Payload]:
+    """
+    Depth-first flatten of DataTree / list / tuple nesting, in input order.
+    One generator frame: nested containers are pushed as iterators on a stack.
+    """
+    stack: List[Iterator[Any]] = [iter((obj,))]
+    while stack:
+        for it in stack[-1]:
+            if it is None:
+                continue
+            if isinstance(it, (list, tuple)):
+                stack.append(iter(it))
+                break
+            if _is_datatree_like(it):
+                # map binds it.Branch now (`it` is rebound by this loop)
+                stack.append(chain.from_iterable(map(it.Branch, range(int(it.BranchCount)))))
+                break
+            yield _unwrap_payload(it)
+        else:
+            stack.pop()
+
+
+# ---------------------------------------------------------------------
+# props helpers
+# ---------------------------------------------------------------------
+def _get_props(pl: Payload) -> Dict[str, Any]:
+    props = pl.get("props")  # type: ignore[arg-type]
+    return props if isinstance(props, dict) else {}
+
+
+def _get_val(pl: Payload, key: str, default: Any = None) -> Any:
+    if key in pl:
+        return pl.get(key, default)  # type: ignore[arg-type]
+    props = _get_props(pl)
+    return props.get(key, default)
+
 
-        def is_datatree_like(x: Any) -> bool:
-            return x is not None and hasattr(x, "BranchCount") and hasattr(x, "Branch")
+def _get_dict(pl: Payload, key: str) -> Dict[str, Any]:
+    v = _get_val(pl, key, {})
+    return v if isinstance(v, dict) else {}
 
-        def unwrap_payload(x: Any) -> Payload:
-            if GH_ObjectWrapper is not None and isinstance(x, GH_ObjectWrapper):  # type: ignore
-                x = getattr(x, "Value", x)
 
-            if not isinstance(x, dict):
-                raise TypeError(f"MatData item is not dict/goo(dict). Got {tname(x)}")
+@lru_cache(maxsize=64)
+def _category_to_ifc_class(cat: str) -> str:
+    # few distinct categories -> each is normalized once per session
+    return _CAT2CLS.get((cat or "").strip().lower(), "IfcBuildingElementProxy")
+
+
+# ---------------------------------------------------------------------
+# Geometry helpers (Rhino only, no model access)
+# ---------------------------------------------------------------------
+# RhinoCommon types bound once per session (FastRenderMesh builds a new parameter object per access)
+if rg is not None:
+    _Mesh, _Brep, _Extrusion, _Surface = rg.Mesh, rg.Brep, rg.Extrusion, rg.Surface
+    _MP_FAST = rg.MeshingParameters.FastRenderMesh
+    _RENDER = rg.MeshType.Render
+else:
+    _Mesh = _Brep = _Extrusion = _Surface = _MP_FAST = _RENDER = None
+
+
+def _cached_render_parts(brep: "rg.Brep") -> Optional[List["rg.Mesh"]]:
+    """Render meshes Rhino already holds on every brep face, else None (no partial reuse)."""
+    parts = []
+    for face in brep.Faces:
+        fm = face.GetMesh(_RENDER)
+        if fm is None:
+            return None
+        parts.append(fm)
+    return parts or None
+
+
+def _brep_to_mesh(brep: "rg.Brep") -> Tuple[Optional["rg.Mesh"], bool]:
+    """Returns (mesh, owned); a single cached face mesh belongs to the brep (owned=False)."""
+    cached = _cached_render_parts(brep)
+    owned_parts = cached is None
+    if cached is None:
+        meshes = _Mesh.CreateFromBrep(brep, _MP_FAST)
+        if not meshes:
+            return None, False
+        parts = [part for part in meshes if part]
+        if len(parts) == 1:
+            m = parts[0]
+            m.Compact()
+            return m, True
+    elif len(cached) == 1:
+        return cached[0], False
+    else:
+        parts = cached
+
+    # Append(IEnumerable<Mesh>) joins in native code
+    m = _Mesh()
+    m.Append(parts)
+    if owned_parts:
+        # copied into m -> release the native part meshes now instead of at CLR finalization
+        # (cached render meshes belong to the brep faces and are left alone)
+        for part in parts:
+            part.Dispose()
+
+    # no ComputeNormals: the IFC mesh representation only reads vertices + face indices
+    m.Compact()
+    return m, True
+
+
+def _geom_to_mesh(geo: Any) -> Tuple[Optional["rg.Mesh"], bool]:
+    """
+    Returns (mesh, owned).
+    owned=True : fresh mesh made here (brep meshing) -> may be mutated in place
+    owned=False: the caller's rg.Mesh or a cached render mesh -> read-only, copied only if it must change
+    """
+    if geo is None:
+        return None, False
+
+    if isinstance(geo, _Mesh):
+        return geo, False
+
+    if isinstance(geo, _Brep):
+        return _brep_to_mesh(geo)
+
+    if isinstance(geo, _Extrusion):
+        rm = geo.GetMesh(_RENDER)
+        if rm is not None:
+            return rm, False
+        return _brep_to_mesh(geo.ToBrep(True))
+
+    if isinstance(geo, _Surface):
+        brep = geo.ToBrep()
+        return _brep_to_mesh(brep)
+
+    brep = _Brep.TryConvertBrep(geo)
+    if brep:
+        return _brep_to_mesh(brep)
+
+    return None, False
+
+
+def _mesh_to_vertices_faces(mesh: "rg.Mesh", owned: bool) -> Tuple[Any, Any]:
+    """(n,3) float64 / (m,3) int arrays on the numpy path, lists of tuples otherwise."""
+    if mesh is None or mesh.Vertices.Count == 0:
+        return [], []
+
+    if HAS_NUMPY:
+        # read-only: one bulk copy each, flat float[] xyz, flat int[] with quads split (asTriangles=True)
+        verts_arr = _np_from_net(mesh.Vertices.ToFloatArray(), np.float32).reshape(-1, 3).astype(np.float64)
+        if COORD_DECIMALS is not None:
+            verts_arr = verts_arr.round(COORD_DECIMALS)
+        faces_arr = _np_from_net(mesh.Faces.ToIntArray(True), np.int32).reshape(-1, 3)
+        if not owned:
+            # caller's / cached mesh may carry unused vertices -> drop them here (never Compact() it in place)
+            used = np.unique(faces_arr)
+            if used.size < verts_arr.shape[0]:
+                remap = np.zeros(verts_arr.shape[0], dtype=np.int32)
+                remap[used] = np.arange(used.size, dtype=np.int32)
+                verts_arr, faces_arr = verts_arr[used], remap[faces_arr]
+        if WELD_VERTICES and weld_mesh is not None:
+            verts_arr, faces_arr = weld_mesh(verts_arr, faces_arr)
+        return verts_arr, faces_arr
+
+    m = mesh
+    if m.Faces.QuadCount > 0:
+        # triangulated in place -> never on the caller's mesh
+        if not owned:
+            m = mesh.DuplicateMesh()
+        m.Faces.ConvertQuadsToTriangles()
+
+    # indexed reads into pre-sized lists: no .NET enumerator / __next__ per item, no list growth
+    vs, fs = m.Vertices, m.Faces
+    fc = fs.Count
+    faces: List[Any] = [None] * fc
+    for i in range(fc):
+        f = fs[i]
+        faces[i] = (int(f.A), int(f.B), int(f.C))
+
+    src: Any = range(vs.Count)
+    if not owned:
+        # caller's / cached mesh may carry unused vertices -> skip them (never Compact() it in place)
+        src = sorted({i for f in faces for i in f})
+        if len(src) < vs.Count:
+            new_index = {old: new for new, old in enumerate(src)}
+            faces = [(new_index[a], new_index[b], new_index[c]) for a, b, c in faces]
+
+    verts: List[Any] = [None] * len(src)
+    nd = COORD_DECIMALS
+    if nd is not None:
+        for k, i in enumerate(src):
+            v = vs[i]
+            verts[k] = (round(float(v.X), nd), round(float(v.Y), nd), round(float(v.Z), nd))
+    else:
+        for k, i in enumerate(src):
+            v = vs[i]
+            verts[k] = (float(v.X), float(v.Y), float(v.Z))
+    return verts, faces
+
+
+def _mesh_digest(verts: Any, faces: Any) -> bytes:
+    """Content hash of a triangulated mesh (key for shared representations)."""
+    h = hashlib.blake2b(digest_size=16)
+    if HAS_NUMPY:
+        # the meshing arrays themselves; no-op conversion unless dtype/layout differ
+        h.update(np.ascontiguousarray(verts, dtype=np.float64).tobytes())
+        h.update(b"|")
+        h.update(np.ascontiguousarray(faces, dtype=np.int64).tobytes())
+    else:
+        h.update(repr(verts).encode("ascii"))
+        h.update(b"|")
+        h.update(repr(faces).encode("ascii"))
+    return h.digest()
+
+
+def _mesh_payload(payload: Payload) -> MeshData:
+    """Rhino-only part of element creation (no model access) -> safe to run in worker threads."""
+    name = payload["name"]
+    cat = payload["category"]
+
+    geo = payload.get("geo", None)
+    mesh, owned = _geom_to_mesh(geo)
+    if mesh is None:
+        raise ValueError(
+            f"[mesh_payload] name='{name}' cat='{cat}': geometry cannot be meshed. geo_type={_tname(geo)}"
+        )
+
+    verts, faces = _mesh_to_vertices_faces(mesh, owned)
+    if len(verts) == 0 or len(faces) == 0:
+        raise ValueError(
+            f"[mesh_payload] name='{name}' cat='{cat}': empty mesh after meshing. geo_type={_tname(geo)}"
+        )
+    digest = _mesh_digest(verts, faces)
+    # 1-based CoordIndex built here (worker thread), not in the serial IFC writes
+    if HAS_NUMPY:
+        # the only array -> list conversion, for create_entity at the IFC boundary
+        return verts.tolist(), (faces + 1 if TESSELLATED_BODY else faces).tolist(), digest
+    if TESSELLATED_BODY:
+        faces = [(a + 1, b + 1, c + 1) for a, b, c in faces]
+    return verts, faces, digest
+
+
+# ---------------------------------------------------------------------
+# Export context (IFC writes; ifcopenshell is not thread-safe -> serial only)
+# ---------------------------------------------------------------------
+class _Ctx:
+    """Per-export IFC state passed to the module-level writers."""
+
+    __slots__ = (
+        "model",
+        "body",
+        "storey",
+        "create_entity",
+        "assign_object",
+        "add_mesh_rep",
+        "assign_rep",
+        "api_add_pset",
+        "api_edit_pset",
+        "shape_cache",
+        "map_origin",
+        "map_target",
+        "shared_psets",
+    )
+
+    def __init__(self, model: Any, body: Any, storey: Any) -> None:
+        self.model = model
+        self.body = body
+        self.storey = storey
+        # hot-path api calls bypass ifc_run's usecase lookup
+        self.create_entity = _api("root.create_entity")
+        self.assign_object = _api("aggregate.assign_object")
+        self.add_mesh_rep = _api("geometry.add_mesh_representation")
+        self.assign_rep = _api("geometry.assign_representation")
+        self.api_add_pset = _api("pset.add_pset")
+        self.api_edit_pset = _api("pset.edit_pset")
+        # identical meshes (same coordinates) share one body (IfcRepresentationMap once reused)
+        self.shape_cache: Dict[bytes, _BodyShape] = {}
+        # identity placement / operator shared by all maps and mapped items (created on first reuse)
+        self.map_origin: Any = None
+        self.map_target: Any = None
+        # (pset name, ((key, value type, value), ...)) -> elements; one IfcPropertySet per distinct content
+        self.shared_psets: Dict[Tuple[str, Tuple[Any, ...]], List[Any]] = defaultdict(list)
+
+
+def _add_pset(ctx: _Ctx, product: Any, pset_name: str, props: Dict[str, Any]) -> None:
+    # single filtering pass; empty psets never reach the api
+    clean = {k: v for k, v in props.items() if v is not None and v != ""}
+    if not clean:
+        return
+    pset = ctx.api_add_pset(ctx.model, product=product, name=pset_name)
+    ctx.api_edit_pset(ctx.model, pset=pset, properties=clean)
+
+
+def _flush_shared_psets(ctx: _Ctx) -> int:
+    """Write each distinct element pset once and relate it to all its elements."""
+    model, api_add_pset, api_edit_pset = ctx.model, ctx.api_add_pset, ctx.api_edit_pset
+    for (pset_name, items), products in ctx.shared_psets.items():
+        props = {k: v for k, _, v in items}
+        pset = api_add_pset(model, product=products[0], name=pset_name)
+        api_edit_pset(model, pset=pset, properties=props)
+        if len(products) == 1:
+            continue
+        rels = getattr(pset, "DefinesOccurrence", None)
+        if rels:
+            rels[0].RelatedObjects = list(products)
+        else:
+            for product in products[1:]:
+                p2 = api_add_pset(model, product=product, name=pset_name)
+                api_edit_pset(model, pset=p2, properties=props)
+    return len(ctx.shared_psets)
+
+
+def _map_body(ctx: _Ctx, body: _BodyShape) -> Any:
+    """
+    Second user of `body`: move its representation into an IfcRepresentationMap and
+    re-point the first owner to a mapped representation. Returns the map.
+    """
+    model = ctx.model
+    if ctx.map_target is None:
+        origin = model.create_entity("IfcCartesianPoint", Coordinates=(0.0, 0.0, 0.0))
+        ctx.map_origin = model.create_entity("IfcAxis2Placement3D", Location=origin)
+        ctx.map_target = model.create_entity("IfcCartesianTransformationOperator3D", LocalOrigin=origin)
+
+    rep_map = model.create_entity(
+        "IfcRepresentationMap",
+        MappingOrigin=ctx.map_origin,
+        MappedRepresentation=body.rep,
+    )
+    pds = body.owner.Representation
+    mapped = _mapped_representation(model, ctx.body, rep_map, ctx.map_target)
+    pds.Representations = [mapped if r == body.rep else r for r in pds.Representations]
+
+    body.rep_map = rep_map
+    body.owner = None
+    return rep_map
+
+
+def _create_element(ctx: _Ctx, payload: Payload, mesh_data: MeshData) -> Any:
+    """IFC writes for one element."""
+    model = ctx.model
+    name = payload["name"]
+    cat = payload["category"]
+    ifc_class = payload["_ifc_class"]  # type: ignore[typeddict-item]
+
+    elem = ctx.create_entity(model, ifc_class=ifc_class, name=name)
+
+    verts, faces, digest = mesh_data
+    shape_cache = ctx.shape_cache
+    body = shape_cache.get(digest)
+    if body is None:
+        if TESSELLATED_BODY:
+            shape = _add_triangulated_representation(model, ctx.body, verts, faces)
+        else:
+            shape = ctx.add_mesh_rep(
+                model,
+                context=ctx.body,
+                vertices=(verts,),
+                faces=(faces,),
+                unit_scale=1.0,
+                force_faceted_brep=True,
+            )
+        shape_cache[digest] = _BodyShape(shape, elem)
+    else:
+        rep_map = body.rep_map if body.rep_map is not None else _map_body(ctx, body)
+        shape = _mapped_representation(model, ctx.body, rep_map, ctx.map_target)
+    ctx.assign_rep(model, product=elem, representation=shape)
+
+    uid = payload["unit_id"]
+    # (scope, cid) cached by the grouping pass; BULK cid is already normalized
+    scope, cid = payload["_sc"]  # type: ignore[typeddict-item]
+    container_id = cid if scope == "BULK" else _get_props(payload).get("container_id")
+
+    part_no = _get_val(payload, "part_no")
+    dims = _get_dict(payload, "dims")
+    material = _get_dict(payload, "material")
+    finish = _get_dict(payload, "finish")
+    color_code = _get_val(payload, "color_code")
+    source_guid = _get_val(payload, "source_guid")
+
+    # one list of psets per element; empty source dicts are skipped up front
+    psets: List[Tuple[str, Dict[str, Any]]] = [
+        ("Pset_CWIdentity", {
+            "Scope": scope,
+            "UnitId": uid,
+            "ContainerId": str(container_id) if container_id is not None else None,
+            "PartNo": part_no,
+            "Category": cat,
+            "SourceGuid": source_guid,
+        }),
+    ]
+    if dims:
+        psets.append(("Pset_CWDimensions", {
+            "Length_mm": dims.get("L"),
+            "Width_mm": dims.get("W"),
+            "Radius_mm": dims.get("R"),
+        }))
+    if material:
+        psets.append(("Pset_CWMaterial", {
+            "MaterialName": material.get("name"),
+        }))
+    if finish:
+        psets.append(("Pset_CWSurfaceFinish", {
+            "FinishType": finish.get("type"),
+            "FinishThickness_um": finish.get("thickness_um"),
+        }))
+    if color_code is not None:
+        psets.append(("Pset_CWAppearance", {
+            "ColorCode": color_code,
+        }))
+
+    # filter in one loop; identical psets are written once by _flush_shared_psets
+    shared_psets = ctx.shared_psets
+    for pset_name, pset_props in psets:
+        clean = {k: v for k, v in pset_props.items() if v is not None and v != ""}
+        if not clean:
+            continue
+        # value type is part of the key: 100 == 100.0 == True hash alike but map to
+        # IfcInteger / IfcReal / IfcBoolean
+        key = (pset_name, tuple((k, type(v), v) for k, v in clean.items()))
+        try:
+            shared_psets[key].append(elem)
+        except TypeError:
+            # unhashable value -> not shareable, write now
+            pset = ctx.api_add_pset(model, product=elem, name=pset_name)
+            ctx.api_edit_pset(model, pset=pset, properties=clean)
+
+    return elem
+
+
+def _ensure_assembly_chain(
+    ctx: _Ctx,
+    container_elem: Any,
+    scope: str,
+    container_id: str,
+    assembly_path: AsmPath,
+    node_cache: Dict[Tuple[str, ...], Any],
+    chain_cache: Dict[AsmPath, Any],
+) -> Any:
+    """
+    Create / reuse assemblies under `container_elem` following assembly_path.
+    Cache key = tuple of level keys from the container down (path prefix)
+    chain_cache maps a whole interned path -> deepest node (one lookup per repeat path).
+    Returns deepest assembly element.
+    """
+    deepest = chain_cache.get(assembly_path)
+    if deepest is not None:
+        return deepest
+
+    parent = container_elem
+    prefix: Tuple[str, ...] = ()
+
+    for depth, (nm, ky) in enumerate(assembly_path, 1):
+        prefix += (ky,)
+        hit = node_cache.get(prefix)
+        if hit is not None:
+            parent = hit
+            continue
+
+        asm = ctx.create_entity(
+            ctx.model,
+            ifc_class="IfcElementAssembly",
+            name=nm,
+        )
 
-            if "unit_id" not in x:
-                raise KeyError("Payload missing required key: 'unit_id'")
-            if "name" not in x:
-                raise KeyError("Payload missing required key: 'name'")
-            if "geo" not in x:
-                raise KeyError("Payload missing required key: 'geo'")
+        ctx.assign_object(ctx.model, products=[asm], relating_object=parent)
 
-            if "category" not in x or x["category"] is None:
-                x["category"] = "Unspecified"
+        # minimal traceability (low-noise)
+        ps = {"Scope": scope, "ContainerId": container_id, "Level": int(depth), "Name": nm}
+        if ky != nm:
+            ps["Key"] = ky
+        _add_pset(ctx, asm, "Pset_AssemblyNode", ps)
 
-            if "props" not in x or x["props"] is None:
-                x["props"] = {}
+        node_cache[prefix] = asm
+        parent = asm
 
-            if "schema" not in x or x["schema"] is None:
-                x["schema"] = 1
+    chain_cache[assembly_path] = parent
+    return parent
 
-            return x  # type: ignore[return-value]
 
-        def iter_payloads(obj: Any) -> Iterator[Payload]:
-            if obj is None:
-                return
+# ---------------------------------------------------------------------
+# Public API (DO NOT CHANGE signature)
+# ---------------------------------------------------------------------
+def export_ifc_from_matdata(
+    Run: bool,
+    MatData: Any,
+    StoreyName: Any,
+    StoreyElev: Any,
+    OutPath: Any,
+) -> Tuple[bool, str, Optional[str]]:
+    if not Run:
+        return False, "Run=False", None
 
-            if is_datatree_like(obj):
-                for i in range(int(obj.BranchCount)):
-                    br = obj.Branch(i)
-                    for it in br:
-                        for p in iter_payloads(it):
-                            yield p
-                return
+    OK: bool = False
+    # appended per line, joined once (linear regardless of str += optimizations)
+    log_parts: List[str] = []
+    pool: Optional[ThreadPoolExecutor] = None
 
-            if isinstance(obj, (list, tuple)):
-                for it in obj:
-                    for p in iter_payloads(it):
-                        yield p
-                return
+    try:
+        if _IMPORT_ERROR is not None:
+            raise _IMPORT_ERROR
 
-            yield unwrap_payload(obj)
+        create_entity = _api("root.create_entity")
+        assign_object = _api("aggregate.assign_object")
+        assign_container = _api("spatial.assign_container")
 
         # ---------------------------------------------------------------------
-        # props helpers
+        # OutPath normalization
         # ---------------------------------------------------------------------
-        def get_props(pl: Payload) -> Dict[str, Any]:
-            props = pl.get("props")  # type: ignore[arg-type]
-            return props if isinstance(props, dict) else {}
+        def normalize_outpath(out_path: Any, storey_name: str) -> str:
+            p = str(out_path).strip().strip('"') or "."
+            root, ext = os.path.splitext(p)
 
-        def get_val(pl: Payload, key: str, default: Any = None) -> Any:
-            if key in pl:
-                return pl.get(key, default)  # type: ignore[arg-type]
-            props = get_props(pl)
-            return props.get(key, default)
+            # exist_ok makes a separate exists() check redundant
+            if ext == "" or os.path.isdir(p):
+                os.makedirs(p, exist_ok=True)
+                return os.path.join(p, f"{storey_name}_multi_units.ifc")
 
-        def get_dict(pl: Payload, key: str) -> Dict[str, Any]:
-            v = get_val(pl, key, {})
-            return v if isinstance(v, dict) else {}
+            out_dir = os.path.dirname(p)
+            if out_dir:
+                os.makedirs(out_dir, exist_ok=True)
+
+            return p if ext.lower() == ".ifc" else (root + ".ifc")
+
+        storey_name = str(StoreyName)
+        storey_elev = float(StoreyElev)
+        ResolvedOutPath: str = normalize_outpath(OutPath, storey_name)
 
         # ---------------------------------------------------------------------
         # Container (UNIT/BULK) helpers (NEW)
         # ---------------------------------------------------------------------
-        def get_scope(pl: Payload) -> str:
-            scope = get_props(pl).get("scope", "UNIT")
+        def get_container_key(pl: Payload) -> Tuple[str, str]:
+            """
+            (scope, container_id) in one props read.
+            Cached on the payload as pl["_sc"] (refreshed by the grouping pass).
+            """
+            props = _get_props(pl)
+            scope = props.get("scope", "UNIT")
             s = str(scope).strip().upper() if scope is not None else "UNIT"
-            return "BULK" if s == "BULK" else "UNIT"
-
-        def get_container_id(pl: Payload) -> str:
-            scope = get_scope(pl)
-            if scope == "BULK":
-                cid = get_props(pl).get("container_id", "DEFAULT")
+            if s == "BULK":
+                cid = props.get("container_id", "DEFAULT")
                 c = str(cid).strip() if cid is not None else "DEFAULT"
-                return c if c else "DEFAULT"
-            # UNIT
-            uid = pl.get("unit_id", None)
-            if uid is None or str(uid).strip() == "":
-                raise ValueError("UNIT payload missing 'unit_id'.")
-            return str(uid)
+                sc = ("BULK", c if c else "DEFAULT")
+            else:
+                # UNIT
+                uid = pl.get("unit_id", None)
+                if uid is None or uid.strip() == "":
+                    raise ValueError("UNIT payload missing 'unit_id'.")
+                sc = ("UNIT", uid)
+            pl["_sc"] = sc  # type: ignore[typeddict-unknown-key]
+            return sc
 
         def container_display_name(scope: str, cid: str) -> str:
             return f"Bulk_{cid}" if scope == "BULK" else f"Unit_{cid}"
@@ -205,23 +850,33 @@ def export_ifc_from_matdata(
         # ---------------------------------------------------------------------
         # Multi-level Assembly annotation reader
         # ---------------------------------------------------------------------
-        def get_assembly_path(pl: Payload) -> List[Dict[str, str]]:
+        # one shared tuple per distinct path (payloads of a sub-assembly share it)
+        path_intern: Dict[AsmPath, AsmPath] = {}
+        # ifc_assembly shares one assembly_path list between payloads -> normalize each list once
+        path_by_list: Dict[int, AsmPath] = {}
+
+        def get_assembly_path(pl: Payload) -> AsmPath:
             """
             Preferred:
               props["assembly_path"] = [{"name": "...", "key": "..."}, ...]
+              (levels may also be ifc_assembly._AssemblyNode objects)
             Legacy (single level):
               props["assembly"] = {"sub_name": "...", "sub_key": "..."}
             Returns:
-              normalized list of {"name": str, "key": str}
+              interned tuple of (name, key), outermost first
             """
-            props = get_props(pl)
+            props = _get_props(pl)
 
             ap = props.get("assembly_path")
-            out: List[Dict[str, str]] = []
 
             if isinstance(ap, list):
+                hit = path_by_list.get(id(ap))
+                if hit is not None:
+                    return hit
+                out: List[Tuple[str, str]] = []
                 for level in ap:
-                    if not isinstance(level, dict):
+                    # dict levels, or ifc_assembly._AssemblyNode (dict-style .get)
+                    if not isinstance(level, dict) and not hasattr(level, "to_dict"):
                         continue
                     nm = str(level.get("name", "")).strip()
                     ky = str(level.get("key", "")).strip()
@@ -231,8 +886,11 @@ def export_ifc_from_matdata(
                         ky = nm
                     if nm == "":
                         nm = ky
-                    out.append({"name": nm, "key": ky})
-                return out
+                    out.append((nm, ky))
+                norm = tuple(out)
+                norm = path_intern.setdefault(norm, norm)
+                path_by_list[id(ap)] = norm
+                return norm
 
             # backward compatible: single-level tag
             asm = props.get("assembly")
@@ -242,79 +900,20 @@ def export_ifc_from_matdata(
                 if sub_key != "":
                     if sub_name == "":
                         sub_name = sub_key
-                    return [{"name": sub_name, "key": sub_key}]
-
-            return []
-
-        # ---------------------------------------------------------------------
-        # Geometry helpers
-        # ---------------------------------------------------------------------
-        def brep_to_mesh(brep: "rg.Brep") -> Optional["rg.Mesh"]:
-            mp = rg.MeshingParameters.FastRenderMesh
-            meshes = rg.Mesh.CreateFromBrep(brep, mp)
-            if not meshes:
-                return None
-
-            m = rg.Mesh()
-            for part in meshes:
-                if part:
-                    m.Append(part)
-
-            m.Normals.ComputeNormals()
-            m.Compact()
-            return m
-
-        def geom_to_mesh(geo: Any) -> Optional["rg.Mesh"]:
-            if geo is None:
-                return None
-
-            if isinstance(geo, rg.Mesh):
-                m = geo.DuplicateMesh()
-                m.Normals.ComputeNormals()
-                m.Compact()
-                return m
-
-            if isinstance(geo, rg.Brep):
-                return brep_to_mesh(geo)
-
-            if isinstance(geo, rg.Extrusion):
-                return brep_to_mesh(geo.ToBrep(True))
+                    norm = ((sub_name, sub_key),)
+                    return path_intern.setdefault(norm, norm)
 
-            if isinstance(geo, rg.Surface):
-                brep = geo.ToBrep()
-                return brep_to_mesh(brep)
-
-            brep = rg.Brep.TryConvertBrep(geo)
-            if brep:
-                return brep_to_mesh(brep)
-
-            return None
-
-        def mesh_to_vertices_faces(
-            mesh: "rg.Mesh",
-        ) -> Tuple[List[Tuple[float, float, float]], List[Tuple[int, int, int]]]:
-            if mesh is None or mesh.Vertices.Count == 0:
-                return [], []
-
-            m = mesh.DuplicateMesh()
-            m.Faces.ConvertQuadsToTriangles()
-            m.Normals.ComputeNormals()
-            m.Compact()
-
-            verts = [(float(v.X), float(v.Y), float(v.Z)) for v in m.Vertices]
-            faces = [(int(f.A), int(f.B), int(f.C)) for f in m.Faces]
-            return verts, faces
+            return ()
 
         # ---------------------------------------------------------------------
         # IFC setup
         # ---------------------------------------------------------------------
         model = ifcopenshell.file(schema="IFC4")
 
-        project = ifc_run(
-            "root.create_entity",
+        project = create_entity(
             model,
             ifc_class="IfcProject",
-            name=f"{StoreyName}_Export",
+            name=f"{storey_name}_Export",
         )
 
         ifc_run("unit.assign_unit", model, length={"is_metric": True, "raw": "MILLIMETRE"})
@@ -329,195 +928,90 @@ def export_ifc_from_matdata(
             parent=model_context,
         )
 
-        site = ifc_run("root.create_entity", model, ifc_class="IfcSite", name="Default Site")
-        building = ifc_run("root.create_entity", model, ifc_class="IfcBuilding", name="Default Building")
-        storey = ifc_run("root.create_entity", model, ifc_class="IfcBuildingStorey", name=str(StoreyName))
-        storey.Elevation = float(StoreyElev)
-
-        ifc_run("aggregate.assign_object", model, products=[site], relating_object=project)
-        ifc_run("aggregate.assign_object", model, products=[building], relating_object=site)
-        ifc_run("aggregate.assign_object", model, products=[storey], relating_object=building)
+        site = create_entity(model, ifc_class="IfcSite", name="Default Site")
+        building = create_entity(model, ifc_class="IfcBuilding", name="Default Building")
+        storey = create_entity(model, ifc_class="IfcBuildingStorey", name=storey_name)
+        storey.Elevation = storey_elev
 
-        # ---------------------------------------------------------------------
-        # Pset helper
-        # ---------------------------------------------------------------------
-        def add_pset(product: Any, pset_name: str, props: Dict[str, Any]) -> None:
-            if not props:
-                return
-            clean = {k: v for k, v in props.items() if v is not None and v != ""}
-            if not clean:
-                return
-            pset = ifc_run("pset.add_pset", model, product=product, name=pset_name)
-            ifc_run("pset.edit_pset", model, pset=pset, properties=clean)
+        assign_object(model, products=[site], relating_object=project)
+        assign_object(model, products=[building], relating_object=site)
+        assign_object(model, products=[storey], relating_object=building)
 
-        # ---------------------------------------------------------------------
-        # Element creation
-        # ---------------------------------------------------------------------
-        def category_to_ifc_class(cat: str) -> str:
-            c = (cat or "").strip().lower()
-            if c == "vertical":
-                return "IfcMember"
-            if c == "horizontal":
-                return "IfcBeam"
-            return "IfcBuildingElementProxy"
-
-        def create_element(payload: Payload) -> Any:
-            name = str(payload.get("name", "Unnamed"))
-            cat = str(payload.get("category", "Unspecified"))
-            ifc_class = category_to_ifc_class(cat)
-
-            geo = payload.get("geo", None)
-            mesh = geom_to_mesh(geo)
-            if mesh is None:
-                raise ValueError(
-                    f"[create_element] name='{name}' cat='{cat}': geometry cannot be meshed. geo_type={tname(geo)}"
-                )
-
-            verts, faces = mesh_to_vertices_faces(mesh)
-            if not verts or not faces:
-                raise ValueError(
-                    f"[create_element] name='{name}' cat='{cat}': empty mesh after meshing. geo_type={tname(geo)}"
-                )
-
-            elem = ifc_run("root.create_entity", model, ifc_class=ifc_class, name=name)
-
-            shape = ifc_run(
-                "geometry.add_mesh_representation",
-                model,
-                context=body_context,
-                vertices=[verts],
-                faces=[faces],
-                unit_scale=1.0,
-                force_faceted_brep=True,
-            )
-            ifc_run("geometry.assign_representation", model, product=elem, representation=shape)
-
-            uid = str(payload.get("unit_id", ""))
-            props = get_props(payload)
-            scope = get_scope(payload)
-            container_id = props.get("container_id")
-
-            part_no = get_val(payload, "part_no")
-            dims = get_dict(payload, "dims")
-            material = get_dict(payload, "material")
-            finish = get_dict(payload, "finish")
-            color_code = get_val(payload, "color_code")
-            source_guid = get_val(payload, "source_guid")
-
-            add_pset(elem, "Pset_CWIdentity", {
-                "Scope": scope,
-                "UnitId": uid,
-                "ContainerId": str(container_id) if container_id is not None else None,
-                "PartNo": part_no,
-                "Category": cat,
-                "SourceGuid": source_guid,
-            })
-
-            add_pset(elem, "Pset_CWDimensions", {
-                "Length_mm": dims.get("L"),
-                "Width_mm": dims.get("W"),
-                "Radius_mm": dims.get("R"),
-            })
-
-            add_pset(elem, "Pset_CWMaterial", {
-                "MaterialName": material.get("name"),
-            })
-
-            add_pset(elem, "Pset_CWSurfaceFinish", {
-                "FinishType": finish.get("type"),
-                "FinishThickness_um": finish.get("thickness_um"),
-            })
-
-            add_pset(elem, "Pset_CWAppearance", {
-                "ColorCode": color_code,
-            })
-
-            return elem
+        ctx = _Ctx(model, body_context, storey)
 
         # ---------------------------------------------------------------------
         # Flatten -> regroup by container (UNIT + BULK)  (UPDATED)
         # ---------------------------------------------------------------------
-        payloads: List[Payload] = list(iter_payloads(MatData))
-        if not payloads:
+        # single streaming pass: flatten + group + per-geometry bookkeeping (no flat list kept)
+        containers: Dict[Tuple[str, str], List[Payload]] = defaultdict(list)
+        # payloads that carry the same geometry object are meshed once
+        # (identical content from different objects is still shared via shape_cache)
+        first_by_geo: Dict[int, Payload] = {}
+        geo_refs: Counter = Counter()
+        n_payloads = 0
+        for pl in _iter_payloads(MatData):
+            pl["_path"] = get_assembly_path(pl)  # type: ignore[typeddict-unknown-key]
+            pl["_ifc_class"] = _category_to_ifc_class(pl["category"])  # type: ignore[typeddict-unknown-key]
+            containers[get_container_key(pl)].append(pl)
+            gid = id(pl.get("geo"))
+            first_by_geo.setdefault(gid, pl)
+            geo_refs[gid] += 1
+            n_payloads += 1
+        if not n_payloads:
             raise ValueError("MatData is empty (no payloads).")
 
-        containers: Dict[Tuple[str, str], List[Payload]] = {}
-        for idx, pl in enumerate(payloads):
-            scope = get_scope(pl)
-            cid = get_container_id(pl)
-            containers.setdefault((scope, cid), []).append(pl)
-
         # basic log header
-        Log += f"ifcopenshell version: {getattr(ifcopenshell, 'version', 'unknown')}\n"
-        Log += f"Resolved OutPath: {ResolvedOutPath}\n"
-        Log += f"Storey: {StoreyName} Elev(mm): {float(StoreyElev)}\n"
-        Log += f"Containers: {len(containers)} (UNIT+BULK)\n"
-        Log += f"Payloads(flat): {len(payloads)}\n"
+        log_parts.append(f"ifcopenshell version: {getattr(ifcopenshell, 'version', 'unknown')}\n")
+        log_parts.append(f"Resolved OutPath: {ResolvedOutPath}\n")
+        log_parts.append(f"Storey: {storey_name} Elev(mm): {storey_elev}\n")
+        log_parts.append(f"Containers: {len(containers)} (UNIT+BULK)\n")
+        log_parts.append(f"Payloads(flat): {n_payloads}\n")
 
         # ---------------------------------------------------------------------
-        # Multi-level assembly builder (PER CONTAINER)
+        # Meshing (parallel, Rhino only) -> IFC writes below stay serial
         # ---------------------------------------------------------------------
-        def ensure_assembly_chain(
-            container_elem: Any,
-            scope: str,
-            container_id: str,
-            assembly_path: List[Dict[str, str]],
-            node_cache: Dict[Tuple[int, str], Any],
-        ) -> Any:
-            """
-            Create / reuse assemblies under `container_elem` following assembly_path.
-            Cache key = (id(parent), level_key)
-            Returns deepest assembly element.
-            """
-            parent = container_elem
-            depth = 0
-
-            for lvl in assembly_path:
-                depth += 1
-                nm = str(lvl.get("name", "")).strip()
-                ky = str(lvl.get("key", "")).strip()
-                if ky == "" and nm == "":
-                    continue
-                if ky == "":
-                    ky = nm
-                if nm == "":
-                    nm = ky
-
-                k = (id(parent), ky)
-                if k in node_cache:
-                    parent = node_cache[k]
-                    continue
-
-                asm = ifc_run(
-                    "root.create_entity",
-                    model,
-                    ifc_class="IfcElementAssembly",
-                    name=nm,
-                )
-
-                ifc_run("aggregate.assign_object", model, products=[asm], relating_object=parent)
-
-                # minimal traceability (low-noise)
-                ps = {"Scope": scope, "ContainerId": container_id, "Level": int(depth), "Name": nm}
-                if ky != nm:
-                    ps["Key"] = ky
-                add_pset(asm, "Pset_AssemblyNode", ps)
-
-                node_cache[k] = asm
-                parent = asm
-
-            return parent
+        # jobs are submitted in input order and collected in write order, so meshing of
+        # later payloads overlaps the IFC writes of earlier ones; write order stays deterministic
+        mesh_jobs: Dict[int, Any] = {}
+        if PARALLEL_MESHING and len(first_by_geo) > 1:
+            pool = ThreadPoolExecutor(max_workers=os.cpu_count())
+            for gid, pl in first_by_geo.items():
+                mesh_jobs[gid] = pool.submit(_mesh_payload, pl)
+        else:
+            for gid, pl in first_by_geo.items():
+                try:
+                    mesh_jobs[gid] = _mesh_payload(pl)
+                except ValueError as e:
+                    # re-raised by get_mesh for each payload sharing this geometry
+                    mesh_jobs[gid] = e
+        del first_by_geo
+
+        def get_mesh(pl: Payload) -> MeshData:
+            """MeshData for pl; dropped after its last payload so verts/faces are freed incrementally."""
+            gid = id(pl.get("geo"))
+            job = mesh_jobs[gid]
+            geo_refs[gid] -= 1
+            if geo_refs[gid] == 0:
+                del mesh_jobs[gid]
+            if isinstance(job, Future):
+                return job.result()
+            if isinstance(job, ValueError):
+                raise job
+            return job
 
         created_elements = 0
+        skipped_elements = 0
         created_containers = 0
         created_assembly_nodes = 0
 
+        # spatially contained products, assigned to the storey in one call after the loop
+        contained: List[Any] = []
+
         # iterate containers
         for (scope, cid), items in containers.items():
             cname = container_display_name(scope, cid)
 
-            container = ifc_run(
-                "root.create_entity",
+            container = create_entity(
                 model,
                 ifc_class="IfcElementAssembly",
                 name=cname,
@@ -526,54 +1020,87 @@ def export_ifc_from_matdata(
 
             # container-specific pset
             if scope == "UNIT":
-                add_pset(container, "Pset_Unit", {"UnitId": cid})
+                _add_pset(ctx, container, "Pset_Unit", {"UnitId": cid})
             else:
-                add_pset(container, "Pset_Bulk", {"ContainerId": cid})
+                _add_pset(ctx, container, "Pset_Bulk", {"ContainerId": cid})
 
-            # place container under storey
-            ifc_run("spatial.assign_container", model, products=[container], relating_structure=storey)
+            # place container under storey (batched below)
+            contained.append(container)
 
             # cache assemblies per container
-            node_cache: Dict[Tuple[int, str], Any] = {}
+            node_cache: Dict[Tuple[str, ...], Any] = {}
+            chain_cache: Dict[AsmPath, Any] = {}
 
             grouped_count = 0
             direct_count = 0
-            cats: List[str] = []
+            cats: Counter = Counter()
 
             for pl in items:
-                cats.append(str(pl.get("category", "Unspecified")))
-                elem = create_element(pl)
+                cats[pl["category"]] += 1
+                # one unmeshable geometry skips its element, not the whole export
+                try:
+                    mesh_data = get_mesh(pl)
+                except ValueError as e:
+                    skipped_elements += 1
+                    log_parts.append(f"[skip] {pl['name']}: {e}\n")
+                    continue
+                elem = _create_element(ctx, pl, mesh_data)
                 created_elements += 1
 
-                apath = get_assembly_path(pl)
+                apath = pl["_path"]  # type: ignore[typeddict-item]
                 if apath:
-                    deepest = ensure_assembly_chain(container, scope, cid, apath, node_cache)
-                    ifc_run("aggregate.assign_object", model, products=[elem], relating_object=deepest)
+                    deepest = _ensure_assembly_chain(ctx, container, scope, cid, apath, node_cache, chain_cache)
+                    assign_object(model, products=[elem], relating_object=deepest)
                     grouped_count += 1
                 else:
-                    ifc_run("aggregate.assign_object", model, products=[elem], relating_object=container)
+                    assign_object(model, products=[elem], relating_object=container)
                     direct_count += 1
 
             created_assembly_nodes += len(node_cache)
 
-            Log += (
+            log_parts.append(
                 f"{cname}: payloads={len(items)} "
                 f"with_assembly_path={grouped_count} direct_to_container={direct_count} "
-                f"assembly_nodes={len(node_cache)} cats={cats}\n"
+                f"assembly_nodes={len(node_cache)} cats={dict(cats)}\n"
             )
 
-        model.write(ResolvedOutPath)
+        if pool is not None:
+            pool.shutdown()
+            pool = None
+        mesh_jobs.clear()
+
+        written_psets = _flush_shared_psets(ctx)
+
+        # one IfcRelContainedInSpatialStructure for all containers
+        if contained:
+            assign_container(model, products=contained, relating_structure=ctx.storey)
+
+        _write_ifc(model, ResolvedOutPath)
 
         OK = True
-        Log += "\n"
-        Log += f"Created elements: {created_elements}\n"
-        Log += f"Created containers (UNIT+BULK): {created_containers}\n"
-        Log += f"Created assembly nodes (all containers): {created_assembly_nodes}\n"
-        Log += f"Wrote: {ResolvedOutPath}\n"
+        log_parts.append("\n")
+        log_parts.append(f"Created elements: {created_elements}\n")
+        if skipped_elements:
+            log_parts.append(f"Skipped elements: {skipped_elements} (see [skip] lines)\n")
+        log_parts.append(f"Created containers (UNIT+BULK): {created_containers}\n")
+        log_parts.append(f"Created assembly nodes (all containers): {created_assembly_nodes}\n")
+        n_maps = sum(1 for b in ctx.shape_cache.values() if b.rep_map is not None)
+        log_parts.append(
+            f"Mesh representations: {len(ctx.shape_cache)} for {created_elements} elements "
+            f"({n_maps} reused via IfcRepresentationMap)\n"
+        )
+        log_parts.append(f"Element property sets: {written_psets} (shared by content)\n")
+        log_parts.append(f"Wrote: {ResolvedOutPath}\n")
 
-        return OK, Log, ResolvedOutPath
+        return OK, "".join(log_parts), ResolvedOutPath
 
     except Exception as e:
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
         OK = False
-        Log += "\nFAILED:\n" + repr(e) + "\n\n" + traceback.format_exc()
-        return OK, Log, None
+        import traceback  # failure path only
+
+        # formatted from the exception object itself (no sys.exc_info lookup)
+        log_parts.append("\nFAILED:\n" + repr(e) + "\n\n")
+        log_parts.extend(traceback.TracebackException.from_exception(e).format())
+        return OK, "".join(log_parts), None
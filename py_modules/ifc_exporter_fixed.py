@@ -43,6 +43,7 @@ from __future__ import annotations
 
 import os
 import traceback
+from itertools import chain
 from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from ifc_types import Payload
@@ -93,12 +94,12 @@ def export_ifc_from_matdata(
 
             if os.path.isdir(p) or ext == "":
                 out_dir = p
-                if not os.path.exists(out_dir):
-                    os.makedirs(out_dir, exist_ok=True)
+                # exist_ok makes a separate exists() check redundant
+                os.makedirs(out_dir, exist_ok=True)
                 return os.path.join(out_dir, f"{storey_name}_multi_units.ifc")
 
             out_dir = os.path.dirname(p)
-            if out_dir and not os.path.exists(out_dir):
+            if out_dir:
                 os.makedirs(out_dir, exist_ok=True)
 
             root, ext2 = os.path.splitext(p)
@@ -143,24 +144,25 @@ def export_ifc_from_matdata(
             return x  # type: ignore[return-value]
 
         def iter_payloads(obj: Any) -> Iterator[Payload]:
-            if obj is None:
-                return
-
-            if is_datatree_like(obj):
-                for i in range(int(obj.BranchCount)):
-                    br = obj.Branch(i)
-                    for it in br:
-                        for p in iter_payloads(it):
-                            yield p
-                return
-
-            if isinstance(obj, (list, tuple)):
-                for it in obj:
-                    for p in iter_payloads(it):
-                        yield p
-                return
-
-            yield unwrap_payload(obj)
+            """
+            Depth-first flatten of DataTree / list / tuple nesting, in input order.
+            Explicit iterator stack: one frame at any nesting depth (no recursion limit).
+            """
+            stack: List[Iterator[Any]] = [iter((obj,))]
+            while stack:
+                for it in stack[-1]:
+                    if it is None:
+                        continue
+                    if is_datatree_like(it):
+                        # map binds it.Branch now (`it` is rebound by this loop)
+                        stack.append(chain.from_iterable(map(it.Branch, range(int(it.BranchCount)))))
+                        break
+                    if isinstance(it, (list, tuple)):
+                        stack.append(iter(it))
+                        break
+                    yield unwrap_payload(it)
+                else:
+                    stack.pop()
 
         # ---------------------------------------------------------------------
         # props helpers
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+ifc_exporter_numba.py (OPTIONAL Numba kernel for ifc_exporter)
+
+Purpose:
+- Weld coincident mesh vertices and drop degenerate triangles before the
+  vertex/index buffers are written to IFC.
+
+Rule:
+- vertices with identical xyz collapse onto their first occurrence
+  (output order = order of first occurrence)
+- a triangle that references the same welded vertex twice is dropped
+
+Notes:
+- Requires numpy (ifc_exporter only calls this on its numpy path).
+- numba is optional. If it is missing, HAS_NUMBA is False and weld_mesh falls
+  back to np.unique with identical output.
+- Exact coordinate match only (no tolerance): Rhino brep meshes repeat each
+  edge vertex bit-for-bit per face, and a tolerance would move geometry.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Tuple
+
+import numpy as np  # type: ignore
+
+try:
+    from numba import njit, types  # type: ignore
+    from numba.typed import Dict as TypedDict  # type: ignore
+    HAS_NUMBA = True
+except Exception:
+    HAS_NUMBA = False
+
+
+def _weld_mesh_np(verts: Any, faces: Any) -> Tuple[Any, Any]:
+    """(n,3) float64 verts, (m,3) int faces -> welded verts, remapped non-degenerate faces."""
+    _, first, inverse = np.unique(verts, axis=0, return_index=True, return_inverse=True)
+    # np.unique sorts rows -> renumber by first occurrence
+    order = np.argsort(first, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(order.size)
+    remap = rank[inverse.reshape(-1)]
+
+    f = remap[faces]
+    keep = (f[:, 0] != f[:, 1]) & (f[:, 1] != f[:, 2]) & (f[:, 0] != f[:, 2])
+    return verts[first[order]], f[keep]
+
+
+if HAS_NUMBA:
+    _XYZ = types.UniTuple(types.float64, 3)
+
+    @njit(cache=True, nogil=True)
+    def _dedup_verts(verts):  # type: ignore[no-untyped-def]
+        n = verts.shape[0]
+        remap = np.empty(n, dtype=np.int64)
+        src = np.empty(n, dtype=np.int64)
+        index = TypedDict.empty(key_type=_XYZ, value_type=types.int64)
+        count = 0
+        for i in range(n):
+            # +0.0 folds -0.0 onto 0.0 (np.unique treats them as equal too)
+            key = (verts[i, 0] + 0.0, verts[i, 1] + 0.0, verts[i, 2] + 0.0)
+            j = index.get(key, -1)
+            if j < 0:
+                j = count
+                index[key] = j
+                src[j] = i
+                count += 1
+            remap[i] = j
+        return verts[src[:count]], remap
+
+    @njit(cache=True, nogil=True)
+    def _filter_degenerate(faces, remap):  # type: ignore[no-untyped-def]
+        out = np.empty(faces.shape, dtype=np.int64)
+        k = 0
+        for i in range(faces.shape[0]):
+            a = remap[faces[i, 0]]
+            b = remap[faces[i, 1]]
+            c = remap[faces[i, 2]]
+            if a == b or b == c or a == c:
+                continue
+            out[k, 0] = a
+            out[k, 1] = b
+            out[k, 2] = c
+            k += 1
+        return out[:k]
+
+    def weld_mesh(verts: Any, faces: Any) -> Tuple[Any, Any]:
+        if verts.shape[0] == 0:
+            return verts, faces
+        # nogil kernels: meshing worker threads weld in parallel
+        welded, remap = _dedup_verts(np.ascontiguousarray(verts, dtype=np.float64))
+        return welded, _filter_degenerate(np.ascontiguousarray(faces, dtype=np.int64), remap)
+else:
+    weld_mesh = _weld_mesh_np
@@ -13,13 +13,18 @@ Rule:
 
 from __future__ import annotations
 
-from typing import Any, Dict, Iterable, List, Protocol, Sequence, TypedDict, Union
+from typing import Any, Dict, Iterable, Protocol, Sequence, Tuple, TypedDict, Union
 
 # In Grasshopper, a DataTree branch has a "Path" like {0;1;2}. We store it as str.
 PathStr = str
 
+# Same path as its integer indices, e.g. (0, 1, 2). Hashes faster than str and
+# sorts numerically ({2} before {10}); used as the internal key by the builder.
+PathKey = Tuple[int, ...]
+
 # Branch dictionary shape: { "{0;1}": [item, item, ...], ... }
-BranchDict = Dict[PathStr, List[Any]]
+# Values are sequences (len + index): plain lists, or lazy views over DataTree branches.
+BranchDict = Dict[PathStr, Sequence[Any]]
 
 
 class GHDataTreeLike(Protocol):
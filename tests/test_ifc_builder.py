@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""Regression tests for ifc_builder branch ordering (runs outside Rhino/GH)."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "py_modules"))
+
+import ifc_builder  # noqa: E402
+
+
+class _Path:
+    """GH_Path stand-in: value-equal, exposes Indices."""
+
+    def __init__(self, *indices):
+        self.Indices = list(indices)
+
+    def __hash__(self):
+        return hash(tuple(self.Indices))
+
+    def __eq__(self, other):
+        return tuple(self.Indices) == tuple(other.Indices)
+
+    def __str__(self):
+        return "{" + ";".join(str(i) for i in self.Indices) + "}"
+
+
+class _Tree:
+    """DataTree stand-in over {path: items}."""
+
+    def __init__(self, branches):
+        self._branches = branches
+        self._paths = list(branches)
+        self.BranchCount = len(branches)
+
+    def Path(self, i):
+        return self._paths[i]
+
+    def Branch(self, p):
+        return list(self._branches[self._paths[p] if isinstance(p, int) else p])
+
+
+def _names(matdata):
+    return [[pl["name"] for pl in branch] for branch in matdata]
+
+
+def test_broadcast_unit_id_does_not_shift_obj_branches():
+    obj = _Tree({
+        _Path(0, 0): [["g", "A"], ["g", "B"]],
+        _Path(0, 10): [["g", "Z"]],
+        _Path(0, 1): [["g", "C"]],
+        _Path(0, 2): [["g", "Y"]],
+    })
+    # list UnitId / scalar Category only exist at the {0} fallback path
+    matdata, _ = ifc_builder.build_matdata(obj, "vertical", ["U1"])
+
+    # Obj branches first (numeric order), the broadcast-only {0} stays last
+    assert _names(matdata) == [["A", "B"], ["C"], ["Y"], ["Z"], []]
+
+
+def test_to_branch_dict_any_orders_paths_numerically_parent_last():
+    tree = _Tree({_Path(0): ["r"], _Path(0, 10): ["b"], _Path(0, 2): ["a"]})
+    _, paths = ifc_builder.to_branch_dict_any(tree)
+    assert paths == ["{0;2}", "{0;10}", "{0}"]
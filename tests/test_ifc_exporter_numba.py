@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""numba weld kernel vs np.unique fallback (runs outside Rhino/GH)."""
+
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("numba")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "py_modules"))
+
+import ifc_exporter_numba  # noqa: E402
+
+
+def _assert_same(verts, faces):
+    v_nb, f_nb = ifc_exporter_numba.weld_mesh(verts, faces)
+    v_np, f_np = ifc_exporter_numba._weld_mesh_np(verts, faces)
+    assert np.array_equal(v_nb, v_np)
+    assert np.array_equal(f_nb, f_np)
+    return v_nb, f_nb
+
+
+def test_weld_mesh_matches_np_on_repeated_grid_points():
+    rng = np.random.default_rng(0)
+    # few distinct points, many repeats -> real welding
+    verts = rng.integers(0, 4, size=(200, 3)).astype(np.float64)
+    faces = rng.integers(0, 200, size=(150, 3)).astype(np.int32)
+    _assert_same(verts, faces)
+
+
+def test_weld_mesh_matches_np_on_signed_zero_and_degenerate_face():
+    verts = np.array([
+        [0.0, 0.0, 0.0],
+        [1.0, 0.0, 0.0],
+        [-0.0, 0.0, -0.0],  # same point as 0
+        [0.0, 1.0, 0.0],
+    ])
+    faces = np.array([[0, 1, 3], [2, 1, 3], [0, 2, 1]], dtype=np.int32)
+    v, f = _assert_same(verts, faces)
+    assert len(v) == 3
+    # [0, 2, 1] collapses onto (0, 0, 1) -> dropped
+    assert f.tolist() == [[0, 1, 2], [0, 1, 2]]
+
+
+def test_weld_mesh_matches_np_on_empty_faces():
+    verts = np.array([[0.0, 0.0, 0.0], [0.0, 0.0, 0.0], [1.0, 0.0, 0.0]])
+    faces = np.empty((0, 3), dtype=np.int32)
+    v, f = _assert_same(verts, faces)
+    assert len(v) == 2
+    assert f.shape == (0, 3)
+
+
+def test_weld_mesh_matches_np_on_empty_mesh():
+    v, f = _assert_same(np.empty((0, 3)), np.empty((0, 3), dtype=np.int32))
+    assert v.shape == (0, 3)
+    assert f.shape == (0, 3)